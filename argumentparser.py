@@ -1,8 +1,14 @@
 import argparse
 from argparse import ArgumentError
 
+from chatdriver import metrics
+
 
 class ArgumentParser(argparse.ArgumentParser):
+    def parse_known_args(self, args=None, namespace=None):
+        with metrics.phase('parse'):
+            return super().parse_known_args(args, namespace)
+
     def exit(self, status=0, message=None):
         if message is None:
             message = ''
@@ -0,0 +1,112 @@
+# json codec benchmark, run in project directory:
+#   python -m benchmark.codec_bench
+import random
+import time
+
+from chatdriver import codec
+from chatdriver.cq import event
+
+
+def heartbeat_event() -> dict:
+    # go-cqhttp sends one every second
+    return {
+        'interval': 1000,
+        'meta_event_type': 'heartbeat',
+        'post_type': 'meta_event',
+        'self_id': 10000,
+        'status': {
+            'app_enabled': True,
+            'app_good': True,
+            'app_initialized': True,
+            'good': True,
+            'online': True,
+            'plugins_good': None,
+            'stat': {
+                'packet_received': 3456, 'packet_sent': 3210, 'packet_lost': 0,
+                'message_received': 120, 'message_sent': 80, 'disconnect_times': 0,
+                'lost_times': 0, 'last_message_time': 1650000000
+            }
+        },
+        'time': 1650000000
+    }
+
+
+def group_msg_event() -> dict:
+    return {
+        'anonymous': None,
+        'font': 0,
+        'group_id': 123456789,
+        'message': '#mtr -c 100 -r FJ www.example.com',
+        'message_id': -1234567890,
+        'message_seq': 4321,
+        'message_type': 'group',
+        'post_type': 'message',
+        'raw_message': '#mtr -c 100 -r FJ www.example.com',
+        'self_id': 10000,
+        'sender': {
+            'age': 0, 'area': '', 'card': '', 'level': '', 'nickname': '用户',
+            'role': 'member', 'sex': 'unknown', 'title': '', 'user_id': 987654321
+        },
+        'sub_type': 'normal',
+        'time': 1650000000,
+        'user_id': 987654321
+    }
+
+
+def mtr_response(rounds: int = 100, hops: int = 30) -> dict:
+    # mtr with rdns, like a node answers #mtr -c 100
+    rand = random.Random(0)
+    data = list()
+    for _ in range(rounds):
+        round_data = list()
+        for hop in range(hops):
+            if rand.random() < 0.1:
+                round_data.append({'code': 0})
+                continue
+            round_data.append({
+                'code': 258 if hop < hops - 1 else 257,
+                'address': f'10.{hop}.{rand.randint(0, 255)}.{rand.randint(1, 254)}',
+                'rdns': f'ae{hop}-{rand.randint(0, 99)}.core{hop}.city.example.net',
+                'latency': rand.uniform(1, 200)
+            })
+        data.append(round_data)
+    return {'id': 1, 'ok': True, 'result': {'resolved': '93.184.216.34', 'data': data}}
+
+
+def bench(func, arg, seconds: float = 0.5) -> float:
+    # us each call
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while True:
+        for _ in range(16):
+            func(arg)
+        count += 16
+        now = time.perf_counter()
+        if now >= end:
+            return (now - start) / count * 1e6
+
+
+def main():
+    payloads = [
+        ('heartbeat', heartbeat_event()),
+        ('group msg', group_msg_event()),
+        ('mtr 100x30', mtr_response())
+    ]
+    backends = [b for b in ('json', 'msgspec', 'orjson') if b == 'json' or getattr(codec, b) is not None]
+
+    print(f'{"payload":<12}{"size":>10}  {"library":<9}{"encode us":>12}{"decode us":>12}{"typed us":>12}')
+    for name, obj in payloads:
+        raw = codec.dumps(obj)
+        for backend in backends:
+            codec.use(backend)
+            typed = codec.decoder(event.cq_event)
+            encode = bench(codec.dumps, obj)
+            decode = bench(codec.loads, raw)
+            # typed decoding is for events only
+            typed_us = f'{bench(typed, raw):12.2f}' if name != 'mtr 100x30' else f'{"-":>12}'
+            print(f'{name:<12}{len(raw):>10}  {backend:<9}{encode:12.2f}{decode:12.2f}{typed_us}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# end to end benchmark of bot commands with fake go-cqhttp and fake network-measure nodes,
+# run in project directory (needs pics/artists.json like main.py):
+#   python -m benchmark.e2e_bench [-n 50] [--rate 20] [--delay 50] [commands ...]
+# bot, fake nodes and fake go-cqhttp share one process and event loop,
+# compare numbers between runs on the same machine only
+import argparse
+import asyncio
+import os
+import resource
+import time
+
+import aiohttp
+from aiohttp import web
+
+import config
+
+BOT_PORT = 18080
+NODE_PORT = 18081
+WS_KEY = 'bench'
+HTTP_NODE = 'BH'
+WS_NODE = 'BW'
+
+# sample command line of each command in main.py
+COMMANDS = {
+    'nodelist': '#nodelist',
+    'ipr': f'#ipr example.com -r {HTTP_NODE} --no-cache',
+    'ping': f'#ping example.com -r {HTTP_NODE} -c 10 -i 0 --no-cache',
+    'tcping': f'#tcping example.com 443 -r {HTTP_NODE} -c 10 -i 0',
+    'mtr': f'#mtr example.com -r {WS_NODE} -c 10 -i 0',
+    'speed': f'#speed http://example.com/file -r {HTTP_NODE} -t 2000 -i 10',
+    'history': '#history example.com',
+    'updimg': '#updimg',
+    'poi': '#poi 1',
+    'tasks': '#tasks',
+}
+# not run, write session_data.json
+SKIP = ('watch', 'unwatch')
+
+
+def rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except OSError:
+        # peak instead of current outside linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def setup_config():
+    # before main and netmeasure import config values
+    config.bind_ip = '127.0.0.1'
+    config.bind_port = BOT_PORT
+    config.netmeasure_ws_key = WS_KEY
+    config.netmeasure_servers = [(HTTP_NODE, f'http://127.0.0.1:{NODE_PORT}', WS_KEY, 'bench http node')]
+    config.render_backend = 'native'
+    config.history_db = ':memory:'
+    # sender of fake go-cqhttp events
+    config.admin_users = ['20000']
+
+
+async def run_command(cq, name: str, message: str, count: int, rate: float, first_group: int, idle: float) -> dict:
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    groups = await cq.replay([message] * count, rate, first_group)
+    await cq.quiet(idle, 600)
+    events = [cq.events.pop(str(g)) for g in groups]
+    first = [(e['replies'][0] - e['sent']) * 1000 for e in events if e['replies']]
+    done = [(e['replies'][-1] - e['sent']) * 1000 for e in events if e['replies']]
+    end = max([e['replies'][-1] for e in events if e['replies']] + [start])
+    return {
+        'command': name,
+        'events': count,
+        'answered': len(done),
+        'replies': sum(len(e['replies']) for e in events),
+        'rate': count / (end - start) if end > start else 0.0,
+        'first': first,
+        'done': done,
+        'rss': rss_mb(),
+        'rss_delta': rss_mb() - rss_before
+    }
+
+
+def report(results: list):
+    import stats
+
+    print(
+        f'{"command":<10}{"events":>7}{"answered":>9}{"replies":>8}{"events/s":>10}'
+        f'{"first p50":>11}{"first p99":>11}{"done p50":>10}{"done p99":>10}{"rss MB":>9}{"delta":>8}'
+    )
+    for r in results:
+        first = stats.summarize(r['first'], [True] * len(r['first']), 0)
+        done = stats.summarize(r['done'], [True] * len(r['done']), 0)
+        print(
+            f'{r["command"]:<10}{r["events"]:>7}{r["answered"]:>9}{r["replies"]:>8}{r["rate"]:>10.1f}'
+            f'{first["p50"]:>11.1f}{first["p99"]:>11.1f}{done["p50"]:>10.1f}{done["p99"]:>10.1f}'
+            f'{r["rss"]:>9.1f}{r["rss_delta"]:>+8.1f}'
+        )
+    print('latency in ms from event sent to first / last reply')
+
+
+async def bench(args):
+    setup_config()
+    from main import create_app
+    from benchmark.fake_node import fake_node
+    from benchmark.fake_cq import fake_cq
+
+    node = fake_node(WS_KEY, args.delay / 1000)
+    node_runner = web.AppRunner(node.app())
+    await node_runner.setup()
+    await web.TCPSite(node_runner, '127.0.0.1', NODE_PORT).start()
+
+    app, bot = create_app()
+    commands = args.commands or [c for c in bot.cmd_handlers if c not in SKIP]
+    for c in commands:
+        if c not in COMMANDS:
+            print(f'{c}: no sample command line, skipped')
+    commands = [c for c in commands if c in COMMANDS]
+    bot_runner = web.AppRunner(app)
+    await bot_runner.setup()
+    await web.TCPSite(bot_runner, '127.0.0.1', BOT_PORT).start()
+
+    session = aiohttp.ClientSession()
+    cq = fake_cq()
+    try:
+        await node.connect(session, f'ws://127.0.0.1:{BOT_PORT}/netmeasure', WS_NODE, WS_KEY)
+        await cq.connect(session, f'ws://127.0.0.1:{BOT_PORT}/cq')
+        # wait for websocket node registered
+        await asyncio.sleep(0.5)
+
+        results = list()
+        for i, name in enumerate(commands):
+            results.append(await run_command(
+                cq, name, COMMANDS[name], args.n, args.rate, 1000000 * (i + 1), args.idle
+            ))
+            print(f'{name} done')
+        report(results)
+    finally:
+        await cq.close()
+        await node.close()
+        await session.close()
+        # keep benchmark groups out of session_data.json saved on shutdown
+        for group_id in list(bot.group_sessions):
+            if int(group_id) >= 1000000:
+                del bot.group_sessions[group_id]
+        await bot_runner.cleanup()
+        await node_runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='end to end benchmark of bot commands')
+    parser.add_argument('commands', nargs='*', help='commands to run, default all in main.py')
+    parser.add_argument('-n', type=int, default=50, help='events of each command')
+    parser.add_argument('--rate', type=float, default=20, help='events per second')
+    parser.add_argument('--delay', type=float, default=50, help='fake node answer delay ms')
+    parser.add_argument('--idle', type=float, default=2, help='second without reply to end a command')
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
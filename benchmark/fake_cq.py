@@ -0,0 +1,92 @@
+# stand-in of go-cqhttp reverse websocket client for benchmark
+import asyncio
+import itertools
+import time
+
+import aiohttp
+
+from chatdriver import codec
+
+
+class fake_cq:
+    def __init__(self):
+        self.ws = None
+        self.message_ids = itertools.count(1)
+        # {
+        #     group id: {'sent': time, 'replies': [reply time]}
+        # }
+        self.events = dict()
+        # time of last event sent or reply received
+        self.last_activity = None
+        self.reader = None
+
+    async def connect(self, session: aiohttp.ClientSession, url: str):
+        self.ws = await session.ws_connect(url, max_msg_size=0)
+        self.reader = asyncio.create_task(self.read_loop())
+
+    async def close(self):
+        self.reader.cancel()
+        await self.ws.close()
+
+    async def read_loop(self):
+        async for msg in self.ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            action = codec.loads(msg.data)
+            now = time.perf_counter()
+            self.last_activity = now
+            group_id = action.get('params', {}).get('group_id')
+            event = self.events.get(str(group_id))
+            if event is not None:
+                event['replies'].append(now)
+
+    def group_msg(self, group_id: int, message: str) -> dict:
+        return {
+            'post_type': 'message',
+            'message_type': 'group',
+            'sub_type': 'normal',
+            'time': int(time.time()),
+            'self_id': 10000,
+            'group_id': group_id,
+            'user_id': 20000,
+            'message_id': next(self.message_ids),
+            'message': message,
+            'raw_message': message,
+            'font': 0,
+            'sender': {'user_id': 20000, 'nickname': 'bench', 'role': 'member'}
+        }
+
+    async def send(self, group_id: int, message: str):
+        self.last_activity = time.perf_counter()
+        self.events[str(group_id)] = {'sent': self.last_activity, 'replies': list()}
+        await self.ws.send_str(codec.dumps(self.group_msg(group_id, message)).decode('utf-8'))
+
+    async def heartbeat(self):
+        await self.ws.send_str(codec.dumps({
+            'post_type': 'meta_event',
+            'meta_event_type': 'heartbeat',
+            'time': int(time.time()),
+            'self_id': 10000,
+            'interval': 1000
+        }).decode('utf-8'))
+
+    async def replay(self, messages: list, rate: float, first_group: int) -> list:
+        # send each message from its own group at rate events per second
+        # group ids used
+        groups = list()
+        start = time.perf_counter()
+        for i, message in enumerate(messages):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            groups.append(first_group + i)
+            await self.send(first_group + i, message)
+        return groups
+
+    async def quiet(self, idle: float, timeout: float):
+        # wait until nothing sent or received for idle seconds
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            await asyncio.sleep(idle / 4)
+            if self.last_activity is None or time.perf_counter() - self.last_activity >= idle:
+                return
@@ -0,0 +1,133 @@
+# stand-in of network-measure api for benchmark, answers with generated results after a delay
+# http api: /api/resolve /api/ping /api/tcping /api/mtr /api/speed
+# reverse websocket api: connects to bot /netmeasure
+import asyncio
+import hashlib
+import hmac
+import random
+import time
+
+import aiohttp
+from aiohttp import web
+
+from chatdriver import codec
+import nm_frame
+
+# request type of reverse websocket frame
+OPERATIONS = ('resolve', 'ping', 'tcping', 'mtr', 'speed')
+
+
+class fake_node:
+    def __init__(self, key: str, delay: float, hops: int = 12):
+        # delay: second before each answer
+        self.key = key.encode('utf-8')
+        self.delay = delay
+        self.hops = hops
+        self.rand = random.Random(0)
+        self.requests = 0
+        self.ws = None
+        self.reader = None
+
+    def latency(self) -> float:
+        return self.rand.uniform(5, 60)
+
+    def result(self, op: str, request: dict) -> dict:
+        times = request.get('times', 1)
+        if op == 'resolve':
+            return {'data': ['192.0.2.1', '2001:db8::1'], 'ttl': 60}
+        if op == 'ping':
+            return {
+                'resolved': '192.0.2.1',
+                'data': [
+                    {'code': 257, 'latency': self.latency()} if self.rand.random() > 0.05 else {'code': 0}
+                    for _ in range(times)
+                ]
+            }
+        if op == 'tcping':
+            return {
+                'resolved': '192.0.2.1',
+                'data': [{'success': self.rand.random() > 0.05, 'latency': self.latency()} for _ in range(times)]
+            }
+        if op == 'mtr':
+            return {'resolved': '192.0.2.1', 'data': [self.mtr_round() for _ in range(times)]}
+        span = request.get('span', 1000)
+        interval = max(request.get('interval', 100), 1)
+        data = [{'point': p, 'received': self.rand.randint(500000, 1500000) * interval // 1000}
+                for p in range(interval, span + 1, interval)]
+        return {
+            'resolved': '192.0.2.1',
+            'latency': self.latency(),
+            'elapsed': span,
+            'received': sum(d['received'] for d in data),
+            'data': data
+        }
+
+    def mtr_round(self) -> list:
+        return [
+            {
+                'code': 257 if hop == self.hops - 1 else 258,
+                'address': f'198.51.100.{hop + 1}',
+                'rdns': f'hop{hop + 1}.example.net',
+                'latency': self.latency() + hop
+            } if self.rand.random() > 0.05 else {'code': 0, 'address': ''}
+            for hop in range(self.hops)
+        ]
+
+    # http api
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([web.post(f'/api/{op}', self.http_handler) for op in OPERATIONS])
+        return app
+
+    async def http_handler(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        sign = hmac.new(self.key, body, digestmod='sha256').hexdigest()
+        if sign != request.headers.get('X-Signature'):
+            return web.Response(status=403)
+        self.requests += 1
+        op = request.path.rsplit('/', 1)[1]
+        await asyncio.sleep(self.delay)
+        return web.Response(
+            body=codec.dumps({'ok': True, 'result': self.result(op, codec.loads(body))}),
+            content_type='application/json'
+        )
+
+    # reverse websocket api
+
+    async def connect(self, session: aiohttp.ClientSession, url: str, name: str, ws_key: str):
+        ident = f'{name}.{int(time.time()):x}.{self.rand.getrandbits(32):x}'
+        sign = hmac.new(ws_key.encode('utf-8'), ident.encode('utf-8'), digestmod=hashlib.sha256).hexdigest()
+        self.ws = await session.ws_connect(url, headers={'X-Identifier': ident, 'X-Signature': sign})
+        self.reader = asyncio.create_task(self.ws_loop(self.ws))
+
+    async def close(self):
+        if self.ws is not None:
+            self.reader.cancel()
+            await self.ws.close()
+
+    async def ws_loop(self, ws: aiohttp.ClientWebSocketResponse):
+        tasks = set()
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.BINARY:
+                continue
+            for frame_type, payload in nm_frame.unpack(msg.data, 1 << 26):
+                task = asyncio.create_task(self.ws_answer(ws, frame_type, codec.loads(payload)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    async def ws_answer(self, ws: aiohttp.ClientWebSocketResponse, frame_type: int, data: dict):
+        self.requests += 1
+        op = OPERATIONS[frame_type]
+        request = data.get('request')
+        await asyncio.sleep(self.delay)
+        result = self.result(op, request)
+        if op == 'mtr':
+            # one partial frame each round like a real node
+            for round_data in result['data']:
+                await ws.send_bytes(nm_frame.pack(frame_type, codec.dumps(
+                    {'id': data.get('id'), 'partial': True, 'result': {'data': [round_data]}}
+                )))
+        await ws.send_bytes(nm_frame.pack(frame_type, codec.dumps(
+            {'id': data.get('id'), 'ok': True, 'result': result}
+        )))
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+
+
+class lru_cache:
+    def __init__(self, max_size: int, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        # {
+        #     key: (value, expire time or None)
+        # }
+        self.items = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key, default=None, count: bool = True):
+        item = self.items.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            # expired
+            del self.items[key]
+            item = None
+        if item is None:
+            if count:
+                self.misses += 1
+            return default
+        self.items.move_to_end(key)
+        if count:
+            self.hits += 1
+        return item[0]
+
+    def put(self, key, value, ttl: float = None):
+        ttl = ttl if ttl is not None else self.ttl
+        self.items[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self.items.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        self.items.clear()
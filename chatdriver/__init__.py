@@ -4,7 +4,10 @@ from . import *
 from .qqbot import qqbot
 
 __all__ = [
+    'codec',
     'cq',
     'event',
-    'qqbot'
+    'metrics',
+    'qqbot',
+    'tasks'
 ]
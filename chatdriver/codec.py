@@ -0,0 +1,64 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+__all__ = [
+    'backend',
+    'use',
+    'loads',
+    'dumps',
+    'decoder',
+]
+
+# fastest json library installed: orjson > msgspec > json
+# all decode errors are ValueError
+backend = 'orjson' if orjson is not None else 'msgspec' if msgspec is not None else 'json'
+
+
+def use(name: str):
+    # switch library, for benchmark and debug
+    global backend
+    if name not in ('orjson', 'msgspec', 'json') or (name != 'json' and globals()[name] is None):
+        raise ValueError(f'json library {name} not installed')
+    backend = name
+
+
+def loads(data: bytes or str or memoryview):
+    if backend == 'orjson':
+        return orjson.loads(data)
+    if backend == 'msgspec':
+        return msgspec.json.decode(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    if backend == 'orjson':
+        return orjson.dumps(obj)
+    if backend == 'msgspec':
+        return msgspec.json.encode(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decoder(schema: type):
+    # decode function of json with fixed layout, schema is a TypedDict
+    # with msgspec only fields in schema are built and types are checked,
+    # otherwise same as loads
+    if msgspec is None:
+        return loads
+    typed = msgspec.json.Decoder(schema)
+
+    def decode(data: bytes or str or memoryview):
+        if backend == 'msgspec' or backend == 'orjson':
+            return typed.decode(data)
+        return loads(data)
+
+    return decode
@@ -1,20 +1,20 @@
-import json
-import asyncio
-
 import aiohttp
 from aiohttp import web
 
+from chatdriver import codec, metrics
+from chatdriver.tasks import task_registry
 from chatdriver.cq import event
 
 
 class driver:
-    def __init__(self, app: web.Application):
+    def __init__(self, app: web.Application, max_owner_tasks: int = 0):
         app.add_routes([
             web.get('/cq', self.ws_handler)
         ])
 
-        self.task_queue = asyncio.Queue()
-        app.on_startup.append(self.app_startup)
+        # running handler tasks, at most max_owner_tasks of each owner
+        self.tasks = task_registry(app, max_owner_tasks)
+        self.decode_event = codec.decoder(event.cq_event)
 
         # handlers
         self.message_handlers = []
@@ -33,24 +33,6 @@ class driver:
     def reg_notice_handler(self, handler):
         self.notice_handlers.append(handler)
 
-    async def task_gc(self):
-        while True:
-            await asyncio.sleep(60)
-            pending_tasks = list()
-            count = 0
-            while not self.task_queue.empty():
-                task = await self.task_queue.get()
-                if task.done():
-                    count += 1
-                else:
-                    pending_tasks.append(task)
-            print(f'GC: {count} tasks done, {len(pending_tasks)} pending')
-            for t in pending_tasks:
-                self.task_queue.put_nowait(t)
-
-    async def app_startup(self, app: web.Application):
-        app['cq_task_gc'] = asyncio.create_task(self.task_gc())
-
     async def ws_handler(self, request: web.Request) -> web.WebSocketResponse:
         # upgrade to websocket connection
         self.ws = web.WebSocketResponse()
@@ -58,23 +40,31 @@ class driver:
         # received a message
         async for msg in self.ws:
             if msg.type == aiohttp.WSMsgType.TEXT:
-                event_data = json.loads(msg.data)
+                try:
+                    event_data = self.decode_event(msg.data)
+                except ValueError as e:
+                    print(f'bad event: {e}')
+                    continue
                 post_type = event_data.get('post_type')
                 if post_type == 'message':
                     # call message handler
                     for handler in self.message_handlers:
-                        self.task_queue.put_nowait(asyncio.create_task(handler(event.message_event(event_data))))
+                        self.tasks.spawn(handler(event.message_event(event_data)), handler.__name__)
                 elif post_type == 'request':
                     for handler in self.request_handlers:
-                        self.task_queue.put_nowait(asyncio.create_task(handler(event.request_event(event_data))))
+                        self.tasks.spawn(handler(event.request_event(event_data)), handler.__name__)
                 elif post_type == 'notice':
                     for handler in self.notice_handlers:
-                        self.task_queue.put_nowait(asyncio.create_task(handler(event.notice_event(event_data))))
+                        self.tasks.spawn(handler(event.notice_event(event_data)), handler.__name__)
 
         return self.ws
 
+    async def send_action(self, action: dict):
+        with metrics.phase('send'):
+            await self.ws.send_str(codec.dumps(action).decode('utf-8'))
+
     async def send_private_msg(self, usr_id: str, msg: str):
-        await self.ws.send_json({
+        await self.send_action({
             'action': 'send_private_msg',
             'params': {
                 'user_id': usr_id,
@@ -83,7 +73,7 @@ class driver:
         })
 
     async def send_group_msg(self, group_id: str, msg: str):
-        await self.ws.send_json({
+        await self.send_action({
             'action': 'send_group_msg',
             'params': {
                 'group_id': group_id,
@@ -92,7 +82,7 @@ class driver:
         })
 
     async def set_group_ban(self, group_id: str, user_id: str, duration: int):
-        await self.ws.send_json({
+        await self.send_action({
             'action': 'set_group_ban',
             'params': {
                 'group_id': group_id,
@@ -102,7 +92,7 @@ class driver:
         })
 
     async def del_message(self, message_id: int):
-        await self.ws.send_json({
+        await self.send_action({
             'action': 'delete_msg',
             'params': {
                 'message_id': message_id
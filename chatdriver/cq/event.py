@@ -1,6 +1,25 @@
+import typing
+
 import chatdriver.event as ce
 
 
+class cq_sender(typing.TypedDict, total=False):
+    nickname: str
+
+
+class cq_event(typing.TypedDict, total=False):
+    # fields of go-cqhttp event in use, others are skipped when decoding
+    post_type: str
+    message_type: str
+    time: int
+    user_id: int
+    group_id: int
+    sender: cq_sender
+    # string or array by post-format
+    message: typing.Any
+    message_id: int
+
+
 def message_event(event_json: dict) -> ce.msg_event:
     message_type = event_json.get('message_type')
     if message_type == 'private':
@@ -0,0 +1,215 @@
+import bisect
+import contextvars
+import time
+
+from aiohttp import web
+
+__all__ = [
+    'histogram',
+    'describe',
+    'observe',
+    'inc',
+    'reg_collector',
+    'command',
+    'phase',
+    'running',
+    'render',
+    'handler',
+]
+
+# latency buckets (second)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# phases of a command, parse arguments / wait for network-measure nodes / render picture / send message
+PHASES = ('parse', 'backend', 'render', 'send')
+
+
+class histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = tuple(buckets)
+        # count of values in each bucket, last one is +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: dict) -> list:
+        lines = list()
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf', ), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {self.sum}')
+        lines.append(f'{name}_count{_labels(labels)} {self.count}')
+        return lines
+
+
+# {
+#     name: (type, help)
+# }
+_meta = dict()
+# {
+#     name: {
+#         labels tuple: histogram or counter value
+#     }
+# }
+_values = dict()
+# functions called at scrape, return list of (name, labels dict, value)
+_collectors = list()
+# commands running now
+# {
+#     session: number of commands
+# }
+_running = dict()
+# timer of command running in current task, copied to tasks it creates
+_current = contextvars.ContextVar('metrics_command', default=None)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in labels.items()
+    ) + '}'
+
+
+def describe(name: str, metric_type: str, help_text: str):
+    # metric_type: 'counter', 'gauge' or 'histogram'
+    _meta[name] = (metric_type, help_text)
+    _values.setdefault(name, dict())
+
+
+def observe(name: str, labels: dict, value: float):
+    series = _values[name]
+    key = tuple(labels.items())
+    h = series.get(key)
+    if h is None:
+        h = series[key] = histogram()
+    h.observe(value)
+
+
+def inc(name: str, labels: dict, value: float = 1):
+    series = _values[name]
+    key = tuple(labels.items())
+    series[key] = series.get(key, 0) + value
+
+
+def reg_collector(func):
+    _collectors.append(func)
+
+
+class _timer:
+    def __init__(self):
+        # {
+        #     phase: [running count, start of running, total second]
+        # }
+        self.phases = dict()
+
+    def enter(self, name: str):
+        p = self.phases.get(name)
+        if p is None:
+            p = self.phases[name] = [0, 0.0, 0.0]
+        if p[0] == 0:
+            p[1] = time.perf_counter()
+        p[0] += 1
+
+    def exit(self, name: str):
+        p = self.phases[name]
+        p[0] -= 1
+        if p[0] == 0:
+            p[2] += time.perf_counter() - p[1]
+
+
+class command:
+    # time command handler and its phases
+    # with metrics.command('ping', session):
+    #     await handler(msg_event, session)
+    def __init__(self, name: str, session=None):
+        self.name = name
+        self.session = session
+        self.timer = _timer()
+        self.token = None
+        self.start = None
+
+    def __enter__(self):
+        self.token = _current.set(self.timer)
+        self.start = time.perf_counter()
+        inc('qqbot_commands_in_flight', {'command': self.name})
+        _running[self.session] = _running.get(self.session, 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self.token)
+        elapsed = time.perf_counter() - self.start
+        inc('qqbot_commands_in_flight', {'command': self.name}, -1)
+        _running[self.session] -= 1
+        if not _running[self.session]:
+            del _running[self.session]
+        if exc_type is not None and issubclass(exc_type, Exception):
+            inc('qqbot_command_errors_total', {'command': self.name})
+        observe('qqbot_command_seconds', {'command': self.name}, elapsed)
+        # phases overlapping each other (message sent while waiting node) are counted in both,
+        # time of parallel requests to several nodes is counted once
+        for name, (_, _, total) in self.timer.phases.items():
+            observe('qqbot_command_phase_seconds', {'command': self.name, 'phase': name}, total)
+
+
+class phase:
+    # time spent in phase by the command running in current task, nothing if not in a command
+    # with metrics.phase('backend'):
+    #     resp = await ...
+    def __init__(self, name: str):
+        self.name = name
+        self.timer = None
+
+    def __enter__(self):
+        self.timer = _current.get()
+        if self.timer is not None:
+            self.timer.enter(self.name)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timer is not None:
+            self.timer.exit(self.name)
+
+
+def running() -> int:
+    # sessions with command running
+    return len(_running)
+
+
+def render() -> str:
+    collected = dict()
+    for func in _collectors:
+        for name, labels, value in func():
+            collected.setdefault(name, list()).append((labels, value))
+    lines = list()
+    for name, (metric_type, help_text) in _meta.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for key, value in _values.get(name, {}).items():
+            if isinstance(value, histogram):
+                lines.extend(value.lines(name, dict(key)))
+            else:
+                lines.append(f'{name}{_labels(dict(key))} {value}')
+        for labels, value in collected.get(name, ()):
+            lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+async def handler(request: web.Request) -> web.Response:
+    # prometheus text format
+    return web.Response(body=render().encode('utf-8'), headers={
+        'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'
+    })
+
+
+describe('qqbot_command_seconds', 'histogram', 'time of command handler')
+describe('qqbot_command_phase_seconds', 'histogram', 'time of command spent in parse / backend / render / send phase')
+describe('qqbot_command_errors_total', 'counter', 'command handlers raised exception')
+describe('qqbot_commands_in_flight', 'gauge', 'command handlers running')
+describe('qqbot_active_sessions', 'gauge', 'sessions with command running')
+reg_collector(lambda: [('qqbot_active_sessions', {}, running())])
@@ -1,11 +1,12 @@
-import asyncio
 import json
 import os
-from concurrent.futures import ProcessPoolExecutor
 
 from aiohttp import web
 
-from . import cq, event
+from . import cq, event, metrics
+
+
+metrics.describe('qqbot_sessions', 'gauge', 'known sessions, saved or created since start')
 
 
 class msg_session:
@@ -13,7 +14,6 @@ class msg_session:
         self.id = id
         self.bot = bot
         self.driver = driver
-        self.executor = bot.executor
         self.var = dict()
 
     async def send_msg(self, message: str):
@@ -52,18 +52,14 @@ class private_session(msg_session):
 
 
 class qqbot:
-    def __init__(self, app: web.Application):
-        # go-cqhttp chatdriver
-        self.cqdriver = cq.driver(app)
+    def __init__(self, app: web.Application, max_session_tasks: int = 0):
+        # go-cqhttp chatdriver, each session runs at most max_session_tasks handlers at the same time
+        self.cqdriver = cq.driver(app, max_session_tasks)
         self.cqdriver.reg_message_handler(self.msg_handler)
 
         self.var = dict()
         app.on_shutdown.append(self.save_vars)
-
-        # process pool initializer list
-        self.ei = list()
-        # process pool
-        self.executor = ProcessPoolExecutor(max_workers=4, initializer=qqbot.executor_initializer, initargs=(self.ei, ))
+        metrics.reg_collector(self.collect_metrics)
 
         self.cmd_start_char = ''
 
@@ -85,6 +81,8 @@ class qqbot:
         # data-struct that store message handlers
         # [handler, handler]
         self.msg_handlers = list()
+        # user ids allowed to use admin commands
+        self.admins = set()
 
         # read saved session vars
         if os.path.exists('session_data.json'):
@@ -128,9 +126,9 @@ class qqbot:
         else:
             return
 
-        # call message handler
+        # call message handler, not limited by max_session_tasks
         for h in self.msg_handlers:
-            self.cqdriver.task_queue.put_nowait(asyncio.create_task(h(msg_event, _session)))
+            self.cqdriver.tasks.spawn(h(msg_event, _session), h.__name__)
 
         # call command handler
         if msg_event.message[0] in self.cmd_start_char:
@@ -138,12 +136,35 @@ class qqbot:
             cmd = cmd[1:]
             cmd_handler = self.cmd_handlers.get(cmd)
             if cmd_handler is not None:
-                self.cqdriver.task_queue.put_nowait(asyncio.create_task(cmd_handler(msg_event, _session)))
+                task = self.cqdriver.tasks.spawn(
+                    self.run_cmd(cmd, cmd_handler, msg_event, _session), cmd, _session
+                )
+                if task is None:
+                    await _session.send_msg('正在运行的命令过多, 请等待之前的命令完成。')
 
     @staticmethod
-    def executor_initializer(func_args_tuple):
-        for function, args in func_args_tuple:
-            function(*args)
+    async def run_cmd(cmd: str, cmd_handler, msg_event: event.msg_event, _session):
+        with metrics.command(cmd, _session):
+            await cmd_handler(msg_event, _session)
+
+    async def tasks_handler(self, msg_event: event.msg_event, _session):
+        # admin command, list running handler tasks
+        if msg_event.user_id not in self.admins:
+            return
+        running = self.cqdriver.tasks.running()
+        lines = [f'运行中的任务: {len(running)}']
+        for name, owner, age in running[:30]:
+            where = f'{"群" if isinstance(owner, group_session) else "私聊"} {owner.id}' if owner is not None else '-'
+            lines.append(f'{name} {where} {age:.1f}s')
+        if len(running) > 30:
+            lines.append(f'... 另有 {len(running) - 30} 个')
+        await _session.send_msg('\n'.join(lines))
+
+    def collect_metrics(self) -> list:
+        return [
+            ('qqbot_sessions', {'type': 'group'}, len(self.group_sessions)),
+            ('qqbot_sessions', {'type': 'private'}, len(self.private_sessions))
+        ]
 
     def get_group_session(self, id: str):
         _session = self.group_sessions.get(id)
@@ -159,9 +180,6 @@ class qqbot:
             self.private_sessions[id] = _session
         return _session
 
-    def reg_executor_initializer(self, function, *args):
-        self.ei.append((function, args))
-
     def reg_cmd_handler(self, command: str, handler):
         self.cmd_handlers[command] = handler
 
@@ -175,6 +193,10 @@ class qqbot:
     def reg_cmd_start_char(self, c: str):
         self.cmd_start_char += c
 
+    def reg_admins(self, *user_ids):
+        for user_id in user_ids:
+            self.admins.add(str(user_id))
+
 
 if __name__ == "__main__":
     async def test_handler(msg_event, session):
@@ -0,0 +1,87 @@
+import asyncio
+import time
+import traceback
+
+from aiohttp import web
+
+from chatdriver import metrics
+
+__all__ = [
+    'task_registry',
+]
+
+metrics.describe('cq_tasks_running', 'gauge', 'handler tasks running')
+metrics.describe('cq_task_errors_total', 'counter', 'handler tasks raised exception')
+metrics.describe('cq_tasks_rejected_total', 'counter', 'handler tasks not started, owner has too many running')
+
+
+class task_registry:
+    # running handler tasks, removed by done callback when finished
+    def __init__(self, app: web.Application, max_per_owner: int, shutdown_timeout: float = 5):
+        # max running tasks of each owner (session), 0 for no limit
+        self.max_per_owner = max_per_owner
+        self.shutdown_timeout = shutdown_timeout
+        # {
+        #     task: (name, owner, start time)
+        # }
+        self.tasks = dict()
+        # {
+        #     owner: number of running tasks
+        # }
+        self.owners = dict()
+        app.on_shutdown.append(self.app_shutdown)
+        metrics.reg_collector(self.collect_metrics)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def full(self, owner) -> bool:
+        return bool(self.max_per_owner) and owner is not None and self.owners.get(owner, 0) >= self.max_per_owner
+
+    def spawn(self, coro, name: str, owner=None) -> asyncio.Task or None:
+        # None (coroutine closed) if owner has too many running tasks
+        if self.full(owner):
+            coro.close()
+            metrics.inc('cq_tasks_rejected_total', {})
+            return None
+        task = asyncio.create_task(coro)
+        self.tasks[task] = (name, owner, time.monotonic())
+        if owner is not None:
+            self.owners[owner] = self.owners.get(owner, 0) + 1
+        task.add_done_callback(self.done)
+        return task
+
+    def done(self, task: asyncio.Task):
+        name, owner, start = self.tasks.pop(task)
+        if owner is not None:
+            self.owners[owner] -= 1
+            if not self.owners[owner]:
+                del self.owners[owner]
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            metrics.inc('cq_task_errors_total', {})
+            print(f'task {name} failed after {time.monotonic() - start:.1f}s:')
+            traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+    def running(self) -> list:
+        # [(name, owner, age second)], oldest first
+        now = time.monotonic()
+        return sorted(
+            ((name, owner, now - start) for name, owner, start in self.tasks.values()),
+            key=lambda t: t[2],
+            reverse=True
+        )
+
+    async def app_shutdown(self, app: web.Application):
+        tasks = list(self.tasks)
+        if not tasks:
+            return
+        print(f'cancel {len(tasks)} running tasks')
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+
+    def collect_metrics(self) -> list:
+        return [('cq_tasks_running', {}, len(self.tasks))]
@@ -2,6 +2,11 @@
 bind_ip = '127.0.0.1'
 bind_port = 4130
 
+# qq user ids allowed to use admin commands (#tasks)
+admin_users = []
+# max running handlers (commands) of each group / private session, 0 for no limit
+session_max_tasks = 4
+
 # network-measure api revirse websocket key
 netmeasure_ws_key = ''
 
@@ -14,3 +19,109 @@ netmeasure_servers = [
         '中国 福建 电信 AS 4134' # description
     ),
 ]
+
+# mtr / speed test picture (mtr hop table, speed test chart) render backend
+# 'native': draw picture with pillow
+# 'selenium': screenshot static pages with headless firefox
+render_backend = 'native'
+
+# fonts used by native render backend (truetype / opentype font file)
+render_fonts = {
+    'sans': '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    'sans_bold': '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    'mono': '/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf',
+}
+
+# mtr / speed test result pictures are kept in memory
+# expire time (second) and total size limit (byte)
+tmp_store_ttl = 300
+tmp_store_max_bytes = 256 * 1024 * 1024
+
+# rendered picture cache, max number of pictures and expire time (second)
+# start time in picture may be old up to expire time when cache hit
+render_cache_size = 64
+render_cache_ttl = 60
+
+# render worker processes, max jobs waiting for a worker, render timeout (second)
+render_workers = 4
+render_queue_size = 16
+render_timeout = 60
+# restart browser of selenium render backend after rendered pictures
+browser_max_renders = 200
+
+# extra time (second) waiting each node when test on multiple nodes (-r all or -r a,b)
+fan_out_timeout = 10
+
+# recent result cache of each node, max number of results
+# and expire time (second) of each operation, operation not listed is not cached
+result_cache_size = 256
+result_cache_ttl = {
+    'resolve': 60,
+    'ping': 5,
+}
+
+# max running requests on each reverse websocket node, more requests wait in queue
+ws_max_in_flight = 32
+# reverse websocket node request timeout (second), added to the longest time the request may take
+ws_request_timeout = 300
+# max rounds of #mtr -c, final result of all rounds with rdns must fit in ws_max_frame_size
+mtr_max_rounds = 200
+# reverse websocket node message size limit and frame size limit (byte),
+# mtr with rdns of 100 rounds is several MB, request with larger result fails
+ws_max_msg_size = 64 * 1024 * 1024
+ws_max_frame_size = 32 * 1024 * 1024
+
+# http node connection pool
+# max connections, idle keep-alive time (second), dns cache time (second)
+http_conn_limit = 16
+http_keepalive_timeout = 60
+http_dns_cache_ttl = 300
+# http node connect timeout, read timeout beyond the test time (second)
+http_connect_timeout = 5
+http_read_timeout = 10
+
+# default node of -r, 'auto' choose the best node by probe result
+default_node = 'auto'
+# node probe interval (second), ping target of each address family, ping timeout (ms)
+probe_interval = 60
+probe_targets = {
+    4: '1.1.1.1',
+    6: '2606:4700:4700::1111',
+}
+probe_wait = 1000
+# probe without answer probe_timeout second after probe_wait is failed, a silent node does not delay others
+probe_timeout = 5
+
+# concurrent measurements on each node, jobs expected longer than sched_long_job (second) are long jobs,
+# short jobs have their own slots and never wait behind long jobs
+sched_slots = {
+    'short': 8,
+    'long': 2,
+}
+sched_long_job = 10
+
+# equivalent node groups for hedging and failover of resolve, ping and tcping,
+# node name (upper case) -> group name, http nodes not listed are grouped by description
+node_groups = {}
+# hedge to another node of same group if no answer after this percentile of usual latency,
+# at most hedge_max_nodes nodes each request
+hedge_percentile = 95
+hedge_max_nodes = 2
+
+# measurement history database, results are written in batch every history_flush_interval second
+# or when history_batch_size results are waiting
+history_db = 'history.db'
+history_flush_interval = 1
+history_batch_size = 500
+
+# #watch, each probe sends watch_count pings or tcpings watch_interval ms apart with watch_wait ms timeout
+watch_min_interval = 60
+watch_max_per_session = 20
+# probes running at the same time
+watch_max_running = 32
+watch_count = 5
+watch_interval = 200
+watch_wait = 1000
+
+# prometheus metrics path on bind_ip:bind_port, '' to disable
+metrics_path = '/metrics'
@@ -0,0 +1,24 @@
+def minmax(points: list, buckets: int, value) -> list:
+    # at most 2 * buckets points of evenly sampled series for chart,
+    # lowest and highest point of each bucket are kept in original order so peaks and dips stay,
+    # first and last points are always kept
+    if len(points) <= 2 * buckets:
+        return list(points)
+    result = [points[0]]
+    size = (len(points) - 2) / buckets
+    for b in range(buckets):
+        start = 1 + int(b * size)
+        end = 1 + int((b + 1) * size)
+        if start >= end:
+            continue
+        low = high = start
+        for i in range(start + 1, end):
+            v = value(points[i])
+            if v < value(points[low]):
+                low = i
+            elif v > value(points[high]):
+                high = i
+        for i in sorted({low, high}):
+            result.append(points[i])
+    result.append(points[-1])
+    return result
@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from chatdriver import codec
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    kind TEXT NOT NULL,
+    node TEXT NOT NULL,
+    target TEXT NOT NULL,
+    address TEXT,
+    loss REAL,
+    latency REAL,
+    speed REAL,
+    data BLOB
+);
+CREATE INDEX IF NOT EXISTS results_target_time ON results (target, time);
+CREATE INDEX IF NOT EXISTS results_node_time ON results (node, time);
+'''
+
+
+class history_store:
+    # measurement results in sqlite, all database work runs in one thread off the event loop
+    def __init__(self, app: web.Application, path: str, flush_interval: float, batch_size: int):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.db = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # rows not written yet
+        self.pending = list()
+        # created in app_startup on the loop of web server
+        self.wakeup = None
+        self.written = 0
+
+        app.on_startup.append(self.app_startup)
+        app.on_cleanup.append(self.app_cleanup)
+
+    def open(self):
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # readers do not block the writer
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+
+    def write(self, rows: list):
+        with self.db:
+            self.db.executemany(
+                'INSERT INTO results (time, kind, node, target, address, loss, latency, speed, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    async def run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    async def app_startup(self, app: web.Application):
+        self.wakeup = asyncio.Event()
+        await self.run(self.open)
+        app['history_flush'] = asyncio.create_task(self.flush_loop())
+
+    async def app_cleanup(self, app: web.Application):
+        app['history_flush'].cancel()
+        await self.flush()
+        await self.run(self.db.close)
+        self.executor.shutdown()
+
+    @staticmethod
+    def target_key(target: str) -> str:
+        return target.strip().lower()
+
+    def record(
+            self,
+            kind: str,
+            node: str,
+            target: str,
+            address: str = None,
+            loss: float = None,
+            latency: float = None,
+            speed: float = None,
+            data=None
+    ):
+        # loss %, latency ms, speed Mbps
+        self.pending.append((
+            time.time(), kind, node, self.target_key(target), address, loss, latency, speed,
+            codec.dumps(data) if data is not None else None
+        ))
+        if len(self.pending) >= self.batch_size and self.wakeup is not None:
+            self.wakeup.set()
+
+    async def flush(self):
+        rows, self.pending = self.pending, list()
+        if rows:
+            await self.run(self.write, rows)
+            self.written += len(rows)
+
+    async def flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                print(f'history: write failed: {e}')
+
+    def _recent(self, target: str, node: str or None, limit: int) -> list:
+        if node is None:
+            cur = self.db.execute(
+                'SELECT time, kind, node, address, loss, latency, speed FROM results '
+                'WHERE target = ? ORDER BY time DESC LIMIT ?',
+                (target, limit)
+            )
+        else:
+            cur = self.db.execute(
+                'SELECT time, kind, node, address, loss, latency, speed FROM results '
+                'WHERE target = ? AND node = ? ORDER BY time DESC LIMIT ?',
+                (target, node, limit)
+            )
+        return cur.fetchall()
+
+    def _aggregate(self, target: str, node: str or None, since: float) -> list:
+        # index range scan of (target, time)
+        sql = (
+            'SELECT node, kind, count(*), avg(loss), avg(latency), min(latency), max(latency), avg(speed) '
+            'FROM results WHERE target = ? AND time >= ?'
+        )
+        args = [target, since]
+        if node is not None:
+            sql += ' AND node = ?'
+            args.append(node)
+        sql += ' GROUP BY node, kind ORDER BY node, kind'
+        return self.db.execute(sql, args).fetchall()
+
+    async def recent(self, target: str, node: str = None, limit: int = 10) -> list:
+        # [(time, kind, node, address, loss, latency, speed)], newest first
+        await self.flush()
+        return await self.run(self._recent, self.target_key(target), node, limit)
+
+    async def aggregate(self, target: str, since: float, node: str = None) -> list:
+        # [(node, kind, runs, avg loss, avg latency, min latency, max latency, avg speed)]
+        await self.flush()
+        return await self.run(self._aggregate, self.target_key(target), node, since)
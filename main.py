@@ -1,18 +1,19 @@
-import aiohttp
 from aiohttp import web
 
 import config
-from chatdriver import qqbot
+from chatdriver import qqbot, metrics
 from random_pic import random_pic
 from netmeasure import netmeasure
 
 
-if __name__ == "__main__":
-    client_session = aiohttp.ClientSession()
+def create_app() -> tuple:
+    # (app, bot)
     app = web.Application()
+    if config.metrics_path:
+        app.add_routes([web.get(config.metrics_path, metrics.handler)])
 
     rp = random_pic()
-    nm = netmeasure(client_session, app)
+    nm = netmeasure(app)
 
     cmd_handlers = {
         'updimg': rp.update_pic_handler,
@@ -22,13 +23,23 @@ if __name__ == "__main__":
         'ping': nm.ping_handler,
         'tcping': nm.tcping_handler,
         'mtr': nm.mtr_handler,
-        'speed': nm.speed_handler
+        'speed': nm.speed_handler,
+        'history': nm.history_handler,
+        'watch': nm.watch_handler,
+        'unwatch': nm.unwatch_handler
     }
 
-    bot = qqbot(app)
+    bot = qqbot(app, config.session_max_tasks)
+    bot.reg_admins(*config.admin_users)
     bot.reg_cmd_start_char('#$')
     bot.reg_msg_handlers(rp.random_pic_handler)
     bot.reg_cmd_handler_dict(cmd_handlers)
-    bot.reg_executor_initializer(netmeasure.add_browser)
+    bot.reg_cmd_handler('tasks', bot.tasks_handler)
+    # watches saved in sessions
+    nm.watch.restore(list(bot.group_sessions.values()) + list(bot.private_sessions.values()))
+    return app, bot
+
 
+if __name__ == "__main__":
+    app, bot = create_app()
     web.run_app(app, host=config.bind_ip, port=config.bind_port)
@@ -0,0 +1,77 @@
+class mtr_hop:
+    # constant size whatever the number of rounds
+    __slots__ = ('received', 'lost', 'mean', 'm2', 'best', 'worst', 'rdns')
+
+    def __init__(self):
+        self.received = 0
+        self.lost = 0
+        # Welford running mean and sum of squared deviation
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.best = 0.0
+        self.worst = 0.0
+        # address: rdns, in order first seen
+        self.rdns = dict()
+
+    def add(self, probe: dict):
+        if probe['code'] == 257 or probe['code'] == 258:
+            latency = probe['latency']
+            self.received += 1
+            delta = latency - self.mean
+            self.mean += delta / self.received
+            self.m2 += delta * (latency - self.mean)
+            if self.received == 1:
+                self.best = self.worst = latency
+            elif latency < self.best:
+                self.best = latency
+            elif latency > self.worst:
+                self.worst = latency
+        else:
+            self.lost += 1
+        address = probe.get('address')
+        if address and address not in self.rdns:
+            self.rdns[address] = probe.get('rdns') or ''
+
+    @property
+    def sdev(self) -> float:
+        return (self.m2 / (self.received - 1)) ** 0.5 if self.received > 1 else 0.0
+
+    def result(self, hop: int) -> dict:
+        total = self.received + self.lost
+        return {
+            'hop': hop,
+            'address': list(self.rdns.keys()) or [''],
+            'location': '',
+            'rdns': list(self.rdns.values()) or [''],
+            'loss': self.lost / total if total else 1.0,
+            'avg': self.mean,
+            'best': self.best,
+            'worst': self.worst,
+            'sdev': self.sdev,
+            'received': self.received,
+            'lossed': self.lost
+        }
+
+
+class mtr_aggregator:
+    __slots__ = ('hops', 'rounds')
+
+    def __init__(self):
+        self.hops = list()
+        self.rounds = 0
+
+    def add_round(self, round_data: list):
+        # round_data: probe of each hop, None if the round did not reach the hop
+        while len(self.hops) < len(round_data):
+            self.hops.append(mtr_hop())
+        for hop, probe in zip(self.hops, round_data):
+            if probe:
+                hop.add(probe)
+        self.rounds += 1
+
+    def add_rounds(self, rounds: list):
+        for round_data in rounds:
+            self.add_round(round_data)
+
+    def result(self) -> list:
+        return [hop.result(i + 1) for i, hop in enumerate(self.hops)]
@@ -1,21 +1,67 @@
 import asyncio
-import os
+import hashlib
 import random
 import hmac
+import itertools
 import json
-import statistics
-import struct
+import ssl
 import time
-from itertools import zip_longest
 
 import aiohttp
 from aiohttp import web
-from aiofile import async_open
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-
-from config import netmeasure_servers, netmeasure_ws_key, bind_ip, bind_port
+try:
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import WebDriverException
+except ImportError:
+    # selenium is only needed by selenium render backend
+    webdriver = None
+
+from config import netmeasure_servers, netmeasure_ws_key, bind_ip, bind_port, render_backend
+from config import tmp_store_ttl, tmp_store_max_bytes, render_cache_size, render_cache_ttl
+from config import render_workers, render_queue_size, render_timeout, browser_max_renders
+from config import fan_out_timeout, result_cache_size, result_cache_ttl
+from config import watch_min_interval, watch_max_per_session, watch_max_running
+from config import watch_count, watch_interval, watch_wait
+from config import history_db, history_flush_interval, history_batch_size
+from config import mtr_max_rounds, ws_max_in_flight, ws_request_timeout, ws_max_msg_size, ws_max_frame_size
+from config import default_node, probe_interval, probe_targets, probe_wait, probe_timeout
+from config import sched_slots, sched_long_job
+from config import node_groups, hedge_percentile, hedge_max_nodes
+from config import http_conn_limit, http_keepalive_timeout, http_dns_cache_ttl, http_connect_timeout, http_read_timeout
 import argumentparser
+import render
+from tmp_store import tmp_store
+from cache import lru_cache
+from render_pool import render_pool, RenderError
+from singleflight import singleflight
+from node_health import node_health
+from chatdriver import codec, metrics
+import nm_frame
+import stats
+import downsample
+from history import history_store
+from watch import watch_scheduler
+from mtr_agg import mtr_aggregator
+from scheduler import job_scheduler
+
+metrics.describe('netmeasure_node_request_seconds', 'histogram', 'time of requests sent to node, by operation')
+metrics.describe('netmeasure_node_requests_total', 'counter', 'requests sent to node')
+metrics.describe('netmeasure_node_errors_total', 'counter', 'requests without valid response (timeout, connection, bad response)')
+metrics.describe('netmeasure_node_rtt_seconds', 'gauge', 'moving average of node probe round trip time')
+metrics.describe('netmeasure_node_in_flight', 'gauge', 'requests running on node')
+metrics.describe('netmeasure_node_jobs', 'gauge', 'measurement jobs of node holding a slot or waiting, by job class')
+metrics.describe('netmeasure_render_jobs', 'gauge', 'render jobs holding a worker or waiting')
+metrics.describe('netmeasure_render_workers', 'gauge', 'render worker processes')
+metrics.describe('netmeasure_render_restarts_total', 'counter', 'render worker restarts after timeout or crash')
+metrics.describe('netmeasure_history_pending', 'gauge', 'measurement results waiting to be written')
+metrics.describe('netmeasure_history_written_total', 'counter', 'measurement results written')
+metrics.describe('netmeasure_watches', 'gauge', 'watches of all sessions')
+metrics.describe('netmeasure_watch_probes_total', 'counter', 'watch probes run')
+metrics.describe('netmeasure_cache_hits_total', 'counter', 'render cache and node result cache hits')
+metrics.describe('netmeasure_cache_misses_total', 'counter', 'render cache and node result cache misses')
+metrics.describe('netmeasure_shared_calls_total', 'counter', 'calls answered by an identical call already running')
 
 
 class nm_serv:
@@ -26,23 +72,133 @@ class nm_serv:
         self.MTR = None
         self.SPEED = None
 
-    async def send_request(self, req_type: str or int, data: dict) -> dict:
+        self.name = ''
+        # nodes of same group are equivalent for hedging and failover
+        self.group = None
+        self.flight = singleflight()
+        # {
+        #     (operation, parameters): response
+        # }
+        self.cache = lru_cache(result_cache_size)
+        # callbacks of partial result frames of running requests
+        # {
+        #     (operation, parameters): [callback, callback]
+        # }
+        self.partial_listeners = dict()
+        self.health = node_health()
+        # concurrent jobs of short and long measurements on this node
+        self.scheduler = job_scheduler(sched_slots)
+
+    async def send_request(self, req_type: str or int, data: dict, on_partial=None) -> dict:
         pass
 
+    async def request(self, op: str, params: dict, cache: bool = True, on_partial=None, owner=None) -> dict:
+        key = (op, tuple(sorted(
+            (k, v.strip().lower() if k == 'address' else v) for k, v in params.items()
+        )))
+        # recent result of same request
+        ttl = result_cache_ttl.get(op)
+        if ttl and cache:
+            resp = self.cache.get(key)
+            if resp is not None:
+                return resp
+
+        if on_partial is not None:
+            self.partial_listeners.setdefault(key, list()).append(on_partial)
+        try:
+            # identical requests running now share one request to node
+            with metrics.phase('backend'):
+                resp = await self.flight.do(key, self._request, key, getattr(self, op.upper()), params, owner)
+        finally:
+            if on_partial is not None:
+                listeners = self.partial_listeners.get(key)
+                listeners.remove(on_partial)
+                if not listeners:
+                    del self.partial_listeners[key]
+        if ttl and resp is not None and resp.get('ok'):
+            # not longer than dns ttl if node returns it
+            ttl = min(ttl, (resp.get('result') or {}).get('ttl', ttl))
+            self.cache.put(key, resp, ttl)
+        return resp
+
+    async def _request(self, key: tuple, req_type: str or int, params: dict, owner=None) -> dict:
+        data = dict(params)
+        data['stamp'] = int(time.time())
+        data['nonce'] = random.randint(0, 4294967296)
+
+        def on_partial(frame: dict):
+            for listener in list(self.partial_listeners.get(key, ())):
+                listener(frame)
+
+        # owner: session the request is from, waiting jobs of different owners take turns
+        async with self.scheduler.job(self.job_class(data), owner):
+            self.health.in_flight += 1
+            start = time.monotonic()
+            try:
+                resp = await self.send_request(req_type, data, on_partial)
+            finally:
+                self.health.in_flight -= 1
+        elapsed = time.monotonic() - start
+        metrics.observe('netmeasure_node_request_seconds', {'node': self.name, 'op': key[0]}, elapsed)
+        self.health.record(resp, key[0], (elapsed - self.least_time(data)) * 1000)
+        return resp
+
+    @staticmethod
+    def expected_time(data: dict) -> float:
+        # longest time (second) node may take for the request
+        wait = data.get('wait', 0)
+        times = data.get('times', 1)
+        interval = data.get('interval', 0)
+        if 'max_hop' in data:
+            # mtr
+            return times * (interval + wait) / 1000
+        return (wait + data.get('span', 0) + times * interval) / 1000
+
+    @staticmethod
+    def least_time(data: dict) -> float:
+        # time (second) spent waiting between rounds even if every round answers at once
+        if 'span' in data:
+            return data['span'] / 1000
+        return max(data.get('times', 1) - 1, 0) * data.get('interval', 0) / 1000
+
+    @staticmethod
+    def job_class(data: dict) -> str:
+        return 'long' if nm_serv.expected_time(data) > sched_long_job else 'short'
+
+    @staticmethod
+    async def stream(request, *args, **kwargs):
+        # async iterator of partial result frames of request(*args, on_partial=..., **kwargs),
+        # the final response (may be None) is the last item
+        frames = asyncio.Queue()
+        task = asyncio.ensure_future(request(*args, on_partial=frames.put_nowait, **kwargs))
+        try:
+            while not task.done():
+                get = asyncio.ensure_future(frames.get())
+                await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED)
+                if get.done():
+                    yield get.result()
+                else:
+                    get.cancel()
+            while not frames.empty():
+                yield frames.get_nowait()
+            yield task.result()
+        finally:
+            task.cancel()
+
     async def resolve(
             self,
             address: str,
             family: int,
-            wait: str
+            wait: str,
+            cache: bool = True,
+            owner=None
     ) -> dict:
-        data = {
+        params = {
             'address': address,
             'family': family,
-            'wait': wait,
-            'stamp': int(time.time()),
-            'nonce': random.randint(0, 4294967296)
+            'wait': wait
         }
-        return await self.send_request(self.RESOLVE, data)
+        return await self.request('resolve', params, cache, owner=owner)
 
     async def ping(
             self,
@@ -50,18 +206,18 @@ class nm_serv:
             family: int,
             wait: int,
             interval: int,
-            times: int
+            times: int,
+            cache: bool = True,
+            owner=None
     ) -> dict:
-        data = {
-                'address': address,
-                'family': family,
-                'wait': wait,
-                'interval': interval,
-                'times': times,
-                'stamp': int(time.time()),
-                'nonce': random.randint(0, 4294967296)
+        params = {
+            'address': address,
+            'family': family,
+            'wait': wait,
+            'interval': interval,
+            'times': times
         }
-        return await self.send_request(self.PING, data)
+        return await self.request('ping', params, cache, owner=owner)
 
     async def tcping(
             self,
@@ -70,19 +226,18 @@ class nm_serv:
             port: int,
             wait: int,
             interval: int,
-            times: int
+            times: int,
+            owner=None
     ) -> dict:
-        data = {
+        params = {
             'address': address,
             'family': family,
             'port': port,
             'wait': wait,
             'interval': interval,
-            'times': times,
-            'stamp': int(time.time()),
-            'nonce': random.randint(0, 4294967296)
+            'times': times
         }
-        return await self.send_request(self.TCPING, data)
+        return await self.request('tcping', params, owner=owner)
 
     async def mtr(
             self,
@@ -92,20 +247,20 @@ class nm_serv:
             interval: int,
             times: int,
             max_hop: int,
-            rdns: bool
+            rdns: bool,
+            on_partial=None,
+            owner=None
     ) -> dict:
-        data = {
+        params = {
             'address': address,
             'family': family,
             'wait': wait,
             'interval': interval,
             'times': times,
             'max_hop': max_hop,
-            'rdns': rdns,
-            'stamp': int(time.time()),
-            'nonce': random.randint(0, 4294967296)
+            'rdns': rdns
         }
-        return await self.send_request(self.MTR, data)
+        return await self.request('mtr', params, on_partial=on_partial, owner=owner)
 
     async def speed(
             self,
@@ -113,35 +268,35 @@ class nm_serv:
             family: int,
             wait: int,
             span: int,
-            interval: int
+            interval: int,
+            on_partial=None,
+            owner=None
     ) -> dict:
-        data = {
+        params = {
             'url': address,
             'family': family,
             'wait': wait,
             'span': span,
-            'interval': interval,
-            'stamp': int(time.time()),
-            'nonce': random.randint(0, 4294967296)
+            'interval': interval
         }
-        return await self.send_request(self.SPEED, data)
+        return await self.request('speed', params, on_partial=on_partial, owner=owner)
 
 
 class nm_serv_http(nm_serv):
     def __init__(
             self,
-            session: aiohttp.ClientSession,
             name: str,
             host: str,
             key: str,
             description: str
     ):
         super().__init__()
-        self.session = session
+        self.session = None
         self.name = name
         self.host = host
         self.key = bytes(key, encoding='utf-8')
         self.description = description
+        self.group = node_groups.get(name, description)
 
         self.RESOLVE = '/api/resolve'
         self.PING = '/api/ping'
@@ -152,19 +307,47 @@ class nm_serv_http(nm_serv):
     def __str__(self) -> str:
         return f'{self.description} = {self.name}'
 
-    async def send_request(self, req_type: str, data: dict) -> dict:
-        data_text = json.dumps(data)
-        sign = hmac.new(self.key, data_text.encode('utf-8'), digestmod='sha256').hexdigest()
+    async def start(self):
+        # own connection pool of this node, keep-alive connections reuse tls session
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=http_conn_limit,
+                keepalive_timeout=http_keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=http_dns_cache_ttl,
+                ssl=ssl.create_default_context()
+            )
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def send_request(self, req_type: str, data: dict, on_partial=None) -> dict:
+        # http api has no partial result
+        data_bytes = codec.dumps(data)
+        sign = hmac.new(self.key, data_bytes, digestmod='sha256').hexdigest()
         headers = {
             'Content-Type': 'application/json; charset=utf-8',
             'X-Signature': sign
         }
+        timeout = aiohttp.ClientTimeout(
+            connect=http_connect_timeout,
+            sock_read=self.expected_time(data) + http_read_timeout
+        )
         try:
-            async with self.session.post(self.host + req_type, headers=headers, data=data_text) as p:
-                if p.status == 200:
-                    return json.loads(await p.text())
-        except:
-            pass
+            async with self.session.post(self.host + req_type, headers=headers, data=data_bytes, timeout=timeout) as p:
+                if p.status != 200:
+                    return {'ok': False, 'error': 'http', 'info': f'节点返回 HTTP {p.status}'}
+                return codec.loads(await p.read())
+        except asyncio.TimeoutError:
+            return {'ok': False, 'error': 'timeout', 'info': '节点响应超时'}
+        except aiohttp.ClientConnectionError:
+            return {'ok': False, 'error': 'connect', 'info': '节点连接失败'}
+        except aiohttp.ClientError as e:
+            return {'ok': False, 'error': 'http', 'info': f'节点请求失败: {e.__class__.__name__}'}
+        except ValueError:
+            return {'ok': False, 'error': 'decode', 'info': '节点返回数据错误'}
 
 
 class nm_serv_ws(nm_serv):
@@ -172,7 +355,15 @@ class nm_serv_ws(nm_serv):
         super().__init__()
         self.ws = ws
         self.name = name
+        self.group = node_groups.get(name)
+        self.ids = itertools.count(1)
+        # running requests
+        # {
+        #     request id: {'future': future of response, 'on_partial': callback}
+        # }
         self.requests = dict()
+        # requests over limit wait here in order
+        self.in_flight = asyncio.Semaphore(ws_max_in_flight)
 
         self.RESOLVE = 0
         self.PING = 1
@@ -183,28 +374,51 @@ class nm_serv_ws(nm_serv):
     def __str__(self) -> str:
         return f'{self.name}'
 
-    def __del__(self):
-        del self.requests
-
-    async def send_request(self, req_type: int, data: dict) -> dict:
-        _id = random.randint(0, 4294967296)
-        event = asyncio.Event()
-        self.requests[_id] = {
-            'event': event
-        }
-        data_bytes = json.dumps({
-            'id': _id,
-            'request': data
-        }).encode('utf-8')
-        try:
-            await self.ws.send_bytes(
-                struct.pack('!I', req_type) +
-                struct.pack('!I', len(data_bytes)) +
-                data_bytes
-            )
-            await asyncio.wait_for(event.wait(), 300)
-        finally:
-            return self.requests.pop(_id).get('response')
+    async def send_request(self, req_type: int, data: dict, on_partial=None) -> dict:
+        async with self.in_flight:
+            _id = next(self.ids)
+            future = asyncio.get_event_loop().create_future()
+            self.requests[_id] = {
+                'future': future,
+                'on_partial': on_partial
+            }
+            data_bytes = codec.dumps({
+                'id': _id,
+                'request': data
+            })
+            try:
+                await self.ws.send_bytes(nm_frame.pack(req_type, data_bytes))
+                return await asyncio.wait_for(future, ws_request_timeout + self.expected_time(data))
+            except asyncio.TimeoutError:
+                return {'ok': False, 'error': 'timeout', 'info': '节点响应超时'}
+            except ConnectionError:
+                return {'ok': False, 'error': 'connect', 'info': '节点连接已断开'}
+            finally:
+                self.requests.pop(_id, None)
+
+    def response(self, rdata: dict):
+        request = self.requests.get(rdata.get('id'))
+        if request is None:
+            # timeout or cancelled
+            return
+        # frames with "partial": true carry incremental result of a running request
+        # e.g. one mtr round or some speed test samples, the final frame has no "partial"
+        if rdata.get('partial'):
+            if request.get('on_partial') is not None:
+                request['on_partial'](rdata)
+        elif not request['future'].done():
+            request['future'].set_result(rdata)
+
+    def fail(self, _id: int or None, resp: dict):
+        request = self.requests.get(_id)
+        if request is not None and not request['future'].done():
+            request['future'].set_result(resp)
+
+    def close(self):
+        # connection lost, fail running requests
+        for request in self.requests.values():
+            if not request['future'].done():
+                request['future'].set_result({'ok': False, 'error': 'connect', 'info': '节点连接已断开'})
 
 
 class nm_ws_manager:
@@ -221,6 +435,27 @@ class nm_ws_manager:
         self.api_servers = dict()
         self.nonce_last = None
 
+    @staticmethod
+    def handle_frames(api_server: nm_serv_ws, data: bytes):
+        try:
+            for frame_type, payload in nm_frame.unpack(data, ws_max_frame_size):
+                try:
+                    rdata = codec.loads(payload)
+                except ValueError as e:
+                    print(f'ws api: {api_server.name} bad frame: {e}')
+                    continue
+                if not isinstance(rdata, dict):
+                    print(f'ws api: {api_server.name} bad frame: not an object')
+                    continue
+                api_server.response(rdata)
+        except nm_frame.FrameTooLarge as e:
+            print(f'ws api: {api_server.name} bad message: {e}')
+            # fail the request now instead of waiting its timeout
+            api_server.fail(e.request_id(), {'ok': False, 'error': 'too_large', 'info': '节点返回结果过大'})
+        except nm_frame.FrameError as e:
+            # rest of message can not be trusted
+            print(f'ws api: {api_server.name} bad message: {e}')
+
     async def main_handler(self, request: web.Request) -> web.WebSocketResponse or None:
         # check header
         ident = request.headers.get('X-Identifier')
@@ -246,8 +481,10 @@ class nm_ws_manager:
 
         api_name = ident_l[0].upper()
         ws = None
+        api_server = None
         try:
-            ws = web.WebSocketResponse()
+            # messages over limit are refused before read
+            ws = web.WebSocketResponse(max_msg_size=ws_max_msg_size)
             await ws.prepare(request)
 
             api_server = nm_serv_ws(ws, api_name)
@@ -255,38 +492,62 @@ class nm_ws_manager:
             print(f'ws api: {api_name} connected')
             async for msg in ws:
                 if msg.type == aiohttp.WSMsgType.BINARY:
-                    rdata = json.loads(msg.data[8:])
-                    try:
-                        request_id = rdata['id']
-                        request = api_server.requests[request_id]
-                        request['response'] = rdata
-                        request.get('event').set()
-                    except:
-                        pass
+                    self.handle_frames(api_server, msg.data)
         except Exception as e:
             print(str(e))
         finally:
             print(f'lose connection from ws api: {api_name}')
-            del self.api_servers[api_name]
+            if api_server is not None:
+                api_server.close()
+                # node may reconnected already
+                if self.api_servers.get(api_name) is api_server:
+                    del self.api_servers[api_name]
             return ws
 
 
 class netmeasure:
-    def __init__(self, session: aiohttp.ClientSession, app: web.Application):
-        self.session = session
+    def __init__(self, app: web.Application):
         self.app = app
         self.api_servers_http = dict()
         for s in netmeasure_servers:
-            self.api_servers_http[s[0].upper()] = nm_serv_http(session, s[0].upper(), s[1], s[2], s[3])
+            self.api_servers_http[s[0].upper()] = nm_serv_http(s[0].upper(), s[1], s[2], s[3])
 
         self.api_serv_ws_mgr = nm_ws_manager(netmeasure_ws_key, app)
         self.api_servers_ws = self.api_serv_ws_mgr.api_servers
 
-        # mtr screenshot path
+        # mtr / speed test result pages
         self.app.add_routes([
-            web.static('/netmeasurestatic', 'static/'),
-            web.static('/netmeasuretmp', 'tmp/')
+            web.static('/netmeasurestatic', 'static/')
         ])
+        # mtr / speed test result pictures, files left in tmp/ by old versions are removed
+        self.tmp = tmp_store(
+            app,
+            '/netmeasuretmp',
+            f'http://{bind_ip}:{bind_port}',
+            tmp_store_ttl,
+            tmp_store_max_bytes,
+            ('tmp/json', 'tmp/pic')
+        )
+        # rendered pictures
+        # {
+        #     'sha256 of render input': png bytes
+        # }
+        self.render_cache = lru_cache(render_cache_size, render_cache_ttl)
+        self.render_flight = singleflight()
+        self.render_pool = render_pool(
+            render_workers,
+            render_queue_size,
+            render_timeout,
+            netmeasure.init_renderer,
+            finalizer=netmeasure.close_renderer
+        )
+        # every measurement result
+        self.history = history_store(app, history_db, history_flush_interval, history_batch_size)
+        # #watch probes
+        self.watch = watch_scheduler(app, self.watch_probe, watch_max_running)
+        app.on_startup.append(self.app_startup)
+        app.on_cleanup.append(self.app_cleanup)
+        metrics.reg_collector(self.collect_metrics)
 
         self.resolve_parse = argumentparser.ArgumentParser(
             prog='ipr',
@@ -333,6 +594,33 @@ class netmeasure:
         )
         self._add_speed_argument()
 
+        self.history_parse = argumentparser.ArgumentParser(
+            prog='history',
+            description='measurement history',
+            allow_abbrev=False,
+            add_help=False,
+            exit_on_error=False
+        )
+        self._add_history_argument()
+
+        self.watch_parse = argumentparser.ArgumentParser(
+            prog='watch',
+            description='watch target',
+            allow_abbrev=False,
+            add_help=False,
+            exit_on_error=False
+        )
+        self._add_watch_argument()
+
+        self.unwatch_parse = argumentparser.ArgumentParser(
+            prog='unwatch',
+            description='stop watching target',
+            allow_abbrev=False,
+            add_help=False,
+            exit_on_error=False
+        )
+        self._add_unwatch_argument()
+
     def _add_resolve_argument(self):
         self.resolve_parse.add_argument(
             '-h', '--help',
@@ -362,8 +650,13 @@ class netmeasure:
         )
         self.resolve_parse.add_argument(
             '-r',
-            help='测试节点',
-            default='FJ'
+            help='测试节点, auto为自动选择, all为全部节点, 或逗号分隔多个节点',
+            default=default_node
+        )
+        self.resolve_parse.add_argument(
+            '--no-cache',
+            help='不使用最近的测试结果',
+            action='store_true'
         )
 
     def _add_ping_argument(self):
@@ -407,8 +700,13 @@ class netmeasure:
         )
         self.ping_parse.add_argument(
             '-r',
-            help='测试节点',
-            default='FJ'
+            help='测试节点, auto为自动选择, all为全部节点, 或逗号分隔多个节点',
+            default=default_node
+        )
+        self.ping_parse.add_argument(
+            '--no-cache',
+            help='不使用最近的测试结果',
+            action='store_true'
         )
 
     def _add_mtr_argument(self):
@@ -434,7 +732,7 @@ class netmeasure:
         )
         self.mtr_parse.add_argument(
             '-c',
-            help='mtr次数',
+            help=f'mtr次数, 最多{mtr_max_rounds}',
             type=int,
             default=1
         )
@@ -458,8 +756,8 @@ class netmeasure:
         )
         self.mtr_parse.add_argument(
             '-r',
-            help='测试节点',
-            default='FJ'
+            help='测试节点, auto为自动选择',
+            default=default_node
         )
         self.mtr_parse.add_argument(
             '--no-local',
@@ -513,8 +811,8 @@ class netmeasure:
         )
         self.tcping_parse.add_argument(
             '-r',
-            help='测试节点',
-            default='FJ'
+            help='测试节点, auto为自动选择, all为全部节点, 或逗号分隔多个节点',
+            default=default_node
         )
 
     def _add_speed_argument(self):
@@ -558,27 +856,411 @@ class netmeasure:
         )
         self.speed_parse.add_argument(
             '-r',
-            help='测试节点',
-            default='FJ'
+            help='测试节点, auto为自动选择',
+            default=default_node
+        )
+
+    def _add_history_argument(self):
+        self.history_parse.add_argument(
+            '-h', '--help',
+            help='显示帮助',
+            action='help'
+        )
+        self.history_parse.add_argument(
+            'host',
+            help='测试目标'
+        )
+        self.history_parse.add_argument(
+            '-r',
+            help='测试节点, 默认全部节点'
+        )
+        self.history_parse.add_argument(
+            '-n',
+            help='最近记录条数 [1, 50]',
+            type=int,
+            default=10
+        )
+        self.history_parse.add_argument(
+            '-d',
+            help='统计最近天数',
+            type=float,
+            default=1
+        )
+
+    def _add_watch_argument(self):
+        self.watch_parse.add_argument(
+            '-h', '--help',
+            help='显示帮助',
+            action='help'
+        )
+        self.watch_parse.add_argument(
+            'host',
+            help='监控目标, 不填则列出本会话的监控',
+            nargs='?'
+        )
+        self.watch_parse.add_argument(
+            '-p',
+            help='TCP端口, 指定时使用 tcping',
+            type=int
+        )
+        self.watch_parse.add_argument(
+            '-t',
+            help=f'监控间隔 s, 最小{watch_min_interval}',
+            type=int,
+            default=300
+        )
+        self.watch_parse.add_argument(
+            '--loss',
+            help='丢包率阈值 %%',
+            type=float,
+            default=20
+        )
+        self.watch_parse.add_argument(
+            '--latency',
+            help='平均延迟阈值 ms',
+            type=float
+        )
+        self.watch_parse.add_argument(
+            '-r',
+            help='测试节点, auto为自动选择',
+            default=default_node
+        )
+
+    def _add_unwatch_argument(self):
+        self.unwatch_parse.add_argument(
+            '-h', '--help',
+            help='显示帮助',
+            action='help'
+        )
+        self.unwatch_parse.add_argument(
+            'id',
+            help='监控编号, all为全部'
         )
 
     @staticmethod
     def add_browser():
         global firefoxdriver
+        global pages
+        global render_token
+        global render_count
         global ip
         global port
         ip = bind_ip
         port = bind_port
         options = Options()
-        options.headless = True
+        options.add_argument('-headless')
         firefoxdriver = webdriver.Firefox(options=options)
+        firefoxdriver.set_window_size(1280, 720)
+
+        # keep result pages loaded in tabs, results are pushed into page by script
+        # {
+        #     'page name': window handle
+        # }
+        pages = dict()
+        render_token = 0
+        render_count = 0
+        for name, page in (('mtr', 'mtr.html'), ('speed', 'speedtest.html')):
+            if pages:
+                firefoxdriver.execute_script('window.open()')
+                firefoxdriver.switch_to.window(firefoxdriver.window_handles[-1])
+            firefoxdriver.get(f'http://{ip}:{port}/netmeasurestatic/{page}')
+            pages[name] = firefoxdriver.current_window_handle
+
+    @staticmethod
+    def restart_browser():
+        try:
+            firefoxdriver.quit()
+        except Exception:
+            pass
+        netmeasure.add_browser()
+
+    @staticmethod
+    def page_screenshot(page: str, element_id: str, vue: str, data: dict) -> bytes:
+        global render_count
+        # restart browser periodically to release memory
+        if render_count >= browser_max_renders:
+            netmeasure.restart_browser()
+        render_count += 1
+        try:
+            return netmeasure._page_screenshot(page, element_id, vue, data)
+        except WebDriverException:
+            # browser crashed or page broken
+            netmeasure.restart_browser()
+            return netmeasure._page_screenshot(page, element_id, vue, data)
+
+    @staticmethod
+    def _page_screenshot(page: str, element_id: str, vue: str, data: dict) -> bytes:
+        global render_token
+        render_token += 1
+        token = str(render_token)
+
+        firefoxdriver.switch_to.window(pages[page])
+        firefoxdriver.execute_script(f'{vue}.load(arguments[0], arguments[1])', data, token)
+        # wait page mark rendered
+        WebDriverWait(firefoxdriver, 10).until(
+            lambda d: d.find_element('id', element_id).get_attribute('data-ready') == token
+        )
+
+        # window fit content
+        width, height = firefoxdriver.execute_script(
+            'let r = document.getElementById(arguments[0]).getBoundingClientRect();'
+            'return [Math.ceil(r.right), Math.ceil(r.bottom)]',
+            element_id
+        )
+        size = firefoxdriver.get_window_size()
+        if width > size['width'] or height > size['height']:
+            firefoxdriver.set_window_size(max(width, size['width']), max(height, size['height']) + 100)
+        return firefoxdriver.find_element('id', element_id).screenshot_as_png
+
+    @staticmethod
+    def init_renderer():
+        if render_backend == 'selenium':
+            netmeasure.add_browser()
+        else:
+            render.load_fonts()
+
+    @staticmethod
+    def close_renderer():
+        if render_backend == 'selenium':
+            try:
+                firefoxdriver.quit()
+            except Exception:
+                pass
+
+    async def render(self, session, render_func, data: dict) -> str:
+        # same render input (without time) get same picture, return picture url
+        key = hashlib.sha256(json.dumps(
+            [render_func.__name__, {k: v for k, v in data.items() if k != 'time'}],
+            sort_keys=True
+        ).encode('utf-8')).hexdigest()
+        pic = self.render_cache.get(key)
+        if pic is None:
+            # same picture rendering now share one render
+            with metrics.phase('render'):
+                pic = await self.render_flight.do(key, self._render, session, render_func, data, key)
+        return self.tmp.put(f'pic/{key}.png', pic, 'image/png')
+
+    async def _render(self, session, render_func, data: dict, key: str) -> bytes:
+        async def on_queued(position):
+            await session.send_msg(f'图片渲染排队中, 当前排在第 {position} 位。')
+
+        pic = await self.render_pool.submit(render_func, data, on_queued=on_queued)
+        self.render_cache.put(key, pic)
+        return pic
+
+    async def app_startup(self, app: web.Application):
+        for serv in self.api_servers_http.values():
+            await serv.start()
+        app['netmeasure_probe'] = asyncio.create_task(self.probe_loop())
+
+    async def app_cleanup(self, app: web.Application):
+        app['netmeasure_probe'].cancel()
+        for serv in self.api_servers_http.values():
+            await serv.close()
+        await self.render_pool.shutdown()
+
+    def collect_metrics(self) -> list:
+        samples = list()
+        for serv in self.all_servers():
+            node = {'node': serv.name}
+            samples.append(('netmeasure_node_requests_total', node, serv.health.requests))
+            samples.append(('netmeasure_node_errors_total', node, serv.health.errors))
+            if serv.health.rtt is not None:
+                samples.append(('netmeasure_node_rtt_seconds', node, serv.health.rtt / 1000))
+            samples.append(('netmeasure_node_in_flight', node, serv.health.in_flight))
+            samples.append(('netmeasure_cache_hits_total', dict(node, cache='result'), serv.cache.hits))
+            samples.append(('netmeasure_cache_misses_total', dict(node, cache='result'), serv.cache.misses))
+            samples.append(('netmeasure_shared_calls_total', dict(node, call='request'), serv.flight.shared))
+            for job_class in serv.scheduler.slots:
+                samples.append(('netmeasure_node_jobs', dict(node, job_class=job_class, state='running'),
+                                serv.scheduler.running[job_class]))
+                samples.append(('netmeasure_node_jobs', dict(node, job_class=job_class, state='queued'),
+                                serv.scheduler.queued(job_class)))
+        samples.append(('netmeasure_render_jobs', {'state': 'running'}, self.render_pool.running))
+        samples.append(('netmeasure_render_jobs', {'state': 'queued'}, self.render_pool.queued))
+        samples.append(('netmeasure_render_workers', {}, self.render_pool.workers))
+        samples.append(('netmeasure_render_restarts_total', {}, self.render_pool.restarts))
+        samples.append(('netmeasure_cache_hits_total', {'cache': 'render'}, self.render_cache.hits))
+        samples.append(('netmeasure_cache_misses_total', {'cache': 'render'}, self.render_cache.misses))
+        samples.append(('netmeasure_shared_calls_total', {'call': 'render'}, self.render_flight.shared))
+        samples.append(('netmeasure_history_pending', {}, len(self.history.pending)))
+        samples.append(('netmeasure_history_written_total', {}, self.history.written))
+        samples.append(('netmeasure_watches', {}, len(self.watch)))
+        samples.append(('netmeasure_watch_probes_total', {}, self.watch.probe_count))
+        return samples
+
+    def all_servers(self) -> list:
+        return list(self.api_servers_ws.values()) + list(self.api_servers_http.values())
+
+    def auto_server(self, family: int) -> nm_serv or None:
+        # best node for address family by probe result, first node if no probe result
+        servers = self.all_servers()
+        scored = [(serv.health.score(family), serv) for serv in servers]
+        scored = [(score, serv) for score, serv in scored if score is not None]
+        if scored:
+            return min(scored, key=lambda x: x[0])[1]
+        return servers[0] if servers else None
+
+    def get_server(self, name: str, family: int = 0) -> nm_serv or None:
+        if name == 'AUTO':
+            return self.auto_server(family)
+        serv = self.api_servers_ws.get(name)
+        if serv is None:
+            serv = self.api_servers_http.get(name)
+        return serv
+
+    def get_servers(self, remote: str, family: int = 0) -> list or None:
+        # ALL or comma separated node names
+        if remote == 'ALL':
+            return self.all_servers()
+        servers = list()
+        for name in remote.split(','):
+            serv = self.get_server(name.strip(), family)
+            if serv is None:
+                return None
+            if serv not in servers:
+                servers.append(serv)
+        return servers
+
+    async def probe(self, serv: nm_serv):
+        for family, target in probe_targets.items():
+            start = time.monotonic()
+            try:
+                resp = await asyncio.wait_for(
+                    serv.ping(target, family, probe_wait, 0, 1, False),
+                    probe_wait / 1000 + probe_timeout
+                )
+            except asyncio.TimeoutError:
+                resp = None
+                serv.health.record(None)
+            serv.health.probe(family, (time.monotonic() - start) * 1000, resp)
+
+    async def probe_loop(self):
+        # check nodes periodically for -r auto and nodelist
+        while True:
+            await asyncio.gather(*[self.probe(serv) for serv in self.all_servers()])
+            await asyncio.sleep(probe_interval)
+
+    def equivalents(self, serv: nm_serv, family: int = 0) -> list:
+        # other nodes of same group, better nodes first
+        if serv.group is None:
+            return []
+        peers = [s for s in self.all_servers() if s is not serv and s.group == serv.group]
+        return sorted(peers, key=lambda s: (s.health.score(family) is None, s.health.score(family) or 0))
+
+    async def hedged(self, serv: nm_serv, op: str, request, least_time: float, family: int = 0) -> tuple:
+        # for idempotent requests only
+        # request(serv), request an equivalent node too if serv is slower than usual,
+        # or at once if serv fails, first good response wins
+        # (node answered, response)
+        candidates = [serv] + self.equivalents(serv, family)[:hedge_max_nodes - 1]
+        tasks = dict()
+        answered, resp = serv, None
+        try:
+            while candidates or tasks:
+                delay = None
+                if candidates:
+                    s = candidates.pop(0)
+                    tasks[asyncio.ensure_future(request(s))] = s
+                    usual = s.health.percentile(op, hedge_percentile)
+                    if candidates and usual is not None:
+                        delay = least_time + usual / 1000
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    answered, resp = tasks.pop(task), task.result()
+                    if resp is not None and 'error' not in resp:
+                        return answered, resp
+            return answered, resp
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def hedge_note(serv: nm_serv, answered: nm_serv) -> str:
+        if answered is serv:
+            return ''
+        return f'(节点 {serv.name} 响应过慢或失败, 由同组节点 {answered.name} 应答)\n'
+
+    @staticmethod
+    async def fan_out(servers: list, request, timeout: float) -> list:
+        # request every node concurrently
+        # [(serv, response, elapsed ms)]
+        async def _request(serv):
+            start = time.monotonic()
+            try:
+                resp = await asyncio.wait_for(request(serv), timeout)
+            except asyncio.TimeoutError:
+                resp = {'ok': False, 'error': 'timeout', 'info': '请求超时'}
+            return serv, resp, (time.monotonic() - start) * 1000
+
+        return await asyncio.gather(*[_request(s) for s in servers])
+
+    @staticmethod
+    def fan_out_failed(serv: nm_serv, resp: dict) -> str or None:
+        if resp is None:
+            return f'{serv.name}: 请求失败'
+        if not resp.get('ok'):
+            return f'{serv.name}: 请求失败: {resp.get("info")}'
+
+    @staticmethod
+    def latency_results(results: list, success, wait: int) -> tuple:
+        # summaries of fan out results
+        # ([(serv, response, summary)], [failed node text])
+        failed = list()
+        answered = list()
+        for serv, resp, elapsed in results:
+            f = netmeasure.fan_out_failed(serv, resp)
+            if f is not None:
+                failed.append(f)
+            else:
+                answered.append((serv, resp))
+        summaries = stats.summarize_batch(
+            [stats.series(resp.get('result').get('data'), success) for serv, resp in answered],
+            wait
+        )
+        return [(serv, resp, summary) for (serv, resp), summary in zip(answered, summaries)], failed
+
+    @staticmethod
+    def latency_table(answered: list, failed: list) -> str:
+        # one line each node, sort by loss and latency
+        rows = list()
+        for serv, resp, summary in answered:
+            rows.append((
+                summary['success'] == 0,
+                summary['avg'],
+                f'{serv.name} {resp.get("result").get("resolved")} {round(summary["loss"], 2)}% '
+                f'{summary["avg"]:.2f}/{summary["min"]:.2f}/{summary["max"]:.2f}ms'
+            ))
+        rows.sort(key=lambda r: r[:2])
+        return '节点 IP地址 丢包率 平均/最小/最大延迟\n' + '\n'.join([r[2] for r in rows] + failed)
+
+    @staticmethod
+    def first_use(resp: dict) -> bool:
+        # response is recorded in history once, not again for cache hits and callers sharing the request
+        if resp.get('-recorded'):
+            return False
+        resp['-recorded'] = True
+        return True
+
+    def record_latency(self, kind: str, target: str, serv: nm_serv, resp: dict, summary: dict):
+        if not self.first_use(resp):
+            return
+        self.history.record(
+            kind,
+            serv.name,
+            target,
+            resp.get('result').get('resolved'),
+            summary['loss'],
+            summary['avg'] if summary['success'] else None,
+            data=summary
+        )
 
     async def nodelist_handler(self, msg_event, session):
         await session.send_msg(
             'websocket服务器:\n' +
-            '\n'.join([key for key, value in self.api_servers_ws.items()]) +
+            '\n'.join([f'{key} {value.health} {value.scheduler}' for key, value in self.api_servers_ws.items()]) +
             '\nhttp服务器:\n' +
-            '\n'.join([str(value) for key, value in self.api_servers_http.items()])
+            '\n'.join([f'{value} {value.health} {value.scheduler}' for key, value in self.api_servers_http.items()])
         )
 
     async def resolve_handler(self, msg_event, session):
@@ -594,23 +1276,53 @@ class netmeasure:
             wait = wait if wait < 10001 else 10000
             wait = wait if wait > 0 else 2000
             remote = arg.get('r').upper()
+            cache = not arg.get('no_cache')
 
-            serv = self.api_servers_ws.get(remote)
-            if serv is None:
-                serv = self.api_servers_http.get(remote)
-            if serv is None:
+            servers = self.get_servers(remote, family)
+            if not servers:
                 await session.send_msg('指定的节点不存在')
                 return
+            if len(servers) > 1:
+                await session.send_msg(f'正在使用 {len(servers)} 个远程节点解析IP地址。')
+                results = await self.fan_out(
+                    servers,
+                    lambda s: s.resolve(address, family, wait, cache, session),
+                    wait / 1000 + fan_out_timeout
+                )
+                rows = list()
+                failed = list()
+                for serv, resp, elapsed in sorted(results, key=lambda r: r[2]):
+                    f = self.fan_out_failed(serv, resp)
+                    if f is not None:
+                        failed.append(f)
+                    else:
+                        if self.first_use(resp):
+                            self.history.record('resolve', serv.name, address, data=resp.get('result').get('data'))
+                        rows.append(f'{serv.name} {elapsed:.0f}ms: ' + ', '.join(resp.get('result').get('data')))
+                await session.send_msg(
+                    f'{len(servers)} 个远程节点对 {address} 解析结果如下:\n' + '\n'.join(rows + failed)
+                )
+                return
+            serv = servers[0]
             await session.send_msg(f'正在使用远程节点 {str(serv)} 解析IP地址。')
-            resp = await serv.resolve(address, family, wait)
+            answered, resp = await self.hedged(
+                serv,
+                'resolve',
+                lambda s: s.resolve(address, family, wait, cache, session),
+                0,
+                family
+            )
             if resp is not None:
                 if resp.get('ok'):
+                    if self.first_use(resp):
+                        self.history.record('resolve', answered.name, address, data=resp.get('result').get('data'))
                     await session.send_msg(
-                        f'远程节点 {str(serv)}  对 {address} 解析结果如下:\n' +
+                        self.hedge_note(serv, answered) +
+                        f'远程节点 {str(answered)}  对 {address} 解析结果如下:\n' +
                         '\n'.join(resp.get('result').get('data'))
                     )
                 else:
-                    await session.send_msg(f'请求失败: {resp.get("info")}')
+                    await session.send_msg(f'远程节点 {answered.name} 请求失败: {resp.get("info")}')
                 return
             await session.send_msg('请求失败')
         except argumentparser.ArgumentError as err:
@@ -632,48 +1344,55 @@ class netmeasure:
             wait = arg.get('w')
             interval = arg.get('i')
             remote = arg.get('r').upper()
+            cache = not arg.get('no_cache')
 
-            serv = self.api_servers_ws.get(remote)
-            if serv is None:
-                serv = self.api_servers_http.get(remote)
-            if serv is None:
+            servers = self.get_servers(remote, family)
+            if not servers:
                 await session.send_msg('指定的节点不存在')
                 return
+            if len(servers) > 1:
+                await session.send_msg(f'正在使用 {len(servers)} 个远程节点对 {address} 进行 {count} 次 ICMP Ping 测试。'
+                                       f'测试间隔 {interval}ms，超时时间 {wait}ms')
+                results = await self.fan_out(
+                    servers,
+                    lambda s: s.ping(address, family, wait, interval, count, cache, session),
+                    (wait + interval * count) / 1000 + fan_out_timeout
+                )
+                answered, failed = self.latency_results(results, lambda d: d.get('code') == 257, wait)
+                for serv, resp, summary in answered:
+                    self.record_latency('ping', address, serv, resp, summary)
+                await session.send_msg(
+                    f'{len(servers)} 个远程节点对 {address} 进行 {count} 次 ICMP Ping 测试结果如下:\n' +
+                    self.latency_table(answered, failed)
+                )
+                return
+            serv = servers[0]
             await session.send_msg(f'正在使用远程节点 {str(serv)} 对 {address} 进行 {count} 次 ICMP Ping 测试。'
                                    f'测试间隔 {interval}ms，超时时间 {wait}ms')
-            resp = await serv.ping(address, family, wait, interval, count)
+            answered, resp = await self.hedged(
+                serv,
+                'ping',
+                lambda s: s.ping(address, family, wait, interval, count, cache, session),
+                (count - 1) * interval / 1000,
+                family
+            )
             if resp is not None:
                 if resp.get('ok'):
-                    totol_count = len(resp.get('result').get('data'))
                     resp_address = resp.get('result').get('resolved')
-                    success_count = 0
-                    avg_latency = 0
-                    max_latency = 0
-                    min_latency = 2000
-                    for data in resp.get('result').get('data'):
-                        if data.get('code') == 257:
-                            success_count += 1
-                            latency = data.get('latency')
-                            avg_latency += latency
-                            max_latency = max(latency, max_latency)
-                            min_latency = min(latency, min_latency)
-                    if success_count > 0:
-                        avg_latency = avg_latency / success_count
-                        jitter = max_latency - min_latency
-                    else:
-                        avg_latency = wait
-                        max_latency = wait
-                        min_latency = wait
-                        jitter = 0
-                    loss = (totol_count - success_count) / totol_count * 100
+                    summary = stats.summarize(*stats.series(resp.get('result').get('data'), lambda d: d.get('code') == 257), wait)
+                    self.record_latency('ping', address, answered, resp, summary)
                     await session.send_msg(
-                        f'远程节点 {str(serv)}  对 {address} 进行 {count} 次 ICMP Ping 测试结果如下:\n'
-                        f'IP地址: {resp_address} \n丢包率: {round(loss, 2)}%\n接收情况: {success_count}/{totol_count}\n'
-                        f'平均延迟: {round(avg_latency, 2)}ms\n最大延迟: {round(max_latency, 2)}ms\n'
-                        f'最小延迟: {round(min_latency, 2)}ms\n抖动: {round(jitter, 2)}ms'
+                        self.hedge_note(serv, answered) +
+                        f'远程节点 {str(answered)}  对 {address} 进行 {count} 次 ICMP Ping 测试结果如下:\n'
+                        f'IP地址: {resp_address} \n丢包率: {round(summary["loss"], 2)}%\n'
+                        f'接收情况: {summary["success"]}/{summary["total"]}\n'
+                        f'平均延迟: {round(summary["avg"], 2)}ms\n最大延迟: {round(summary["max"], 2)}ms\n'
+                        f'最小延迟: {round(summary["min"], 2)}ms\n标准差: {round(summary["stdev"], 2)}ms\n'
+                        f'P50/P90/P99: {summary["p50"]:.2f}/{summary["p90"]:.2f}/{summary["p99"]:.2f}ms\n'
+                        f'抖动: {round(summary["jitter"], 2)}ms'
                     )
                 else:
-                    await session.send_msg(f'请求失败: {resp.get("info")}')
+                    await session.send_msg(f'远程节点 {answered.name} 请求失败: {resp.get("info")}')
                 return
             await session.send_msg('请求失败')
         except argumentparser.ArgumentError as err:
@@ -697,59 +1416,77 @@ class netmeasure:
             interval = arg.get('i')
             remote = arg.get('r').upper()
 
-            serv = self.api_servers_ws.get(remote)
-            if serv is None:
-                serv = self.api_servers_http.get(remote)
-            if serv is None:
+            servers = self.get_servers(remote, family)
+            if not servers:
                 await session.send_msg('指定的节点不存在')
                 return
+            if len(servers) > 1:
+                await session.send_msg(
+                    f'正在使用 {len(servers)} 个远程节点对 {address} TCP端口 {port} 进行 {count} 次 TCP Ping 测试。'
+                    f'测试间隔 {interval}ms，超时时间 {wait}ms'
+                )
+                results = await self.fan_out(
+                    servers,
+                    lambda s: s.tcping(address, family, port, wait, interval, count, session),
+                    (wait + interval * count) / 1000 + fan_out_timeout
+                )
+                answered, failed = self.latency_results(results, lambda d: d.get('success'), wait)
+                for serv, resp, summary in answered:
+                    self.record_latency(f'tcping:{port}', address, serv, resp, summary)
+                await session.send_msg(
+                    f'{len(servers)} 个远程节点对 {address} TCP端口 {port} 进行 {count} 次 TCP Ping 测试结果如下:\n' +
+                    self.latency_table(answered, failed)
+                )
+                return
+            serv = servers[0]
             await session.send_msg(
                 f'正在使用远程节点 {str(serv)} 对 {address} TCP端口 {port} 进行 {count} 次 TCP Ping 测试。'
                 f'测试间隔 {interval}ms，超时时间 {wait}ms'
             )
-            resp = await serv.tcping(address, family, port, wait, interval, count)
+            answered, resp = await self.hedged(
+                serv,
+                'tcping',
+                lambda s: s.tcping(address, family, port, wait, interval, count, session),
+                (count - 1) * interval / 1000,
+                family
+            )
             if resp is not None:
                 if resp.get('ok'):
-                    totol_count = len(resp.get('result').get('data'))
                     resp_address = resp.get('result').get('resolved')
-                    success_count = 0
-                    avg_latency = 0
-                    max_latency = 0
-                    min_latency = 2000
-                    for data in resp.get('result').get('data'):
-                        if data.get('success'):
-                            success_count += 1
-                            latency = data.get('latency')
-                            avg_latency += latency
-                            max_latency = max(latency, max_latency)
-                            min_latency = min(latency, min_latency)
-                    if success_count > 0:
-                        avg_latency = avg_latency / success_count
-                        jitter = max_latency - min_latency
-                    else:
-                        avg_latency = wait
-                        max_latency = wait
-                        min_latency = wait
-                        jitter = 0
-                    loss = (totol_count - success_count) / totol_count * 100
+                    summary = stats.summarize(*stats.series(resp.get('result').get('data'), lambda d: d.get('success')), wait)
+                    self.record_latency(f'tcping:{port}', address, answered, resp, summary)
                     await session.send_msg(
-                        f'远程节点 {str(serv)} 对 {address} TCP端口 {port}  进行 {count} 次 TCP Ping 测试结果如下:\n'
-                        f'IP地址: {resp_address} \n丢包率: {round(loss, 2)}%\n接收情况: {success_count}/{totol_count}\n'
-                        f'平均延迟: {round(avg_latency, 2)}ms\n最大延迟: {round(max_latency, 2)}ms\n'
-                        f'最小延迟: {round(min_latency, 2)}ms\n抖动: {round(jitter, 2)}ms'
+                        self.hedge_note(serv, answered) +
+                        f'远程节点 {str(answered)} 对 {address} TCP端口 {port}  进行 {count} 次 TCP Ping 测试结果如下:\n'
+                        f'IP地址: {resp_address} \n丢包率: {round(summary["loss"], 2)}%\n'
+                        f'接收情况: {summary["success"]}/{summary["total"]}\n'
+                        f'平均延迟: {round(summary["avg"], 2)}ms\n最大延迟: {round(summary["max"], 2)}ms\n'
+                        f'最小延迟: {round(summary["min"], 2)}ms\n标准差: {round(summary["stdev"], 2)}ms\n'
+                        f'P50/P90/P99: {summary["p50"]:.2f}/{summary["p90"]:.2f}/{summary["p99"]:.2f}ms\n'
+                        f'抖动: {round(summary["jitter"], 2)}ms'
                     )
                 else:
-                    await session.send_msg(f'请求失败: {resp.get("info")}')
+                    await session.send_msg(f'远程节点 {answered.name} 请求失败: {resp.get("info")}')
                 return
             await session.send_msg('请求失败')
         except argumentparser.ArgumentError as err:
             await session.send_msg(f'{str(err)} \n{self.tcping_parse.format_help()}')
 
     @staticmethod
-    def mtr_screenshot(json_name, pic_file):
-        firefoxdriver.set_window_size(800, 10000)
-        firefoxdriver.get(f'http://{ip}:{port}/netmeasurestatic/mtr.html?json={json_name}')
-        firefoxdriver.find_element_by_id("mtr").screenshot(pic_file)
+    def mtr_round_summary(serv: nm_serv, address: str, rounds: list) -> str:
+        # text summary of the first mtr round
+        round_data = rounds[0] if rounds else []
+        lines = list()
+        for hop, i in enumerate(round_data):
+            if i and (i.get('code') == 257 or i.get('code') == 258):
+                lines.append(f'{hop + 1} {i.get("address")} {round(i.get("latency"), 2)}ms')
+            else:
+                lines.append(f'{hop + 1} *')
+        return f'远程节点 {str(serv)} 对 {address} 第1轮 MTR 结果:\n' + '\n'.join(lines)
+
+    @staticmethod
+    def mtr_screenshot(data: dict) -> bytes:
+        return netmeasure.page_screenshot('mtr', 'mtr', 'mtrv', data)
 
     async def mtr_handler(self, msg_event, session):
         try:
@@ -761,7 +1498,7 @@ class netmeasure:
             family = 6 if arg.get('6') else family
 
             count = arg.get('c')
-            count = count if count < 101 else 100
+            count = count if count <= mtr_max_rounds else mtr_max_rounds
             count = count if count > 0 else 5
 
             hops = arg.get('h')
@@ -769,9 +1506,7 @@ class netmeasure:
             interval = arg.get('i')
             remote = arg.get('r').upper()
 
-            serv = self.api_servers_ws.get(remote)
-            if serv is None:
-                serv = self.api_servers_http.get(remote)
+            serv = self.get_server(remote, family)
             if serv is None:
                 await session.send_msg('指定的节点不存在')
                 return
@@ -779,87 +1514,54 @@ class netmeasure:
                 f'正在使用远程节点 {str(serv)} 对 {address} 进行 {count}轮 最大 {hops}跳的 MTR路由追踪。每轮间隔'
                 f' {interval}ms, 每跳超时 {wait}ms。'
             )
-            resp = await serv.mtr(address, family, wait, interval, count, hops, True)
+            resp = None
+            summary_sent = count < 2
+            # rounds folded in as partial frames arrive
+            agg = mtr_aggregator()
+            async for frame in serv.stream(serv.mtr, address, family, wait, interval, count, hops, True, owner=session):
+                if frame is None or not frame.get('partial'):
+                    resp = frame
+                    continue
+                agg.add_rounds(frame.get('result').get('data'))
+                if not summary_sent:
+                    # first round finished, send text summary before whole mtr finished
+                    summary_sent = True
+                    await session.send_msg(self.mtr_round_summary(serv, address, frame.get('result').get('data')))
             if resp is not None:
                 if resp.get('ok'):
                     rdata = resp.get('result').get('data')
-                    hops = max(map(len, rdata))
-                    z = zip_longest(*rdata)
-
-                    result = [
-                        {
-                            'hop': i + 1,
-                            'address': list(),
-                            'location': '',
-                            'rdns': list(),
-                            'loss': 0.0,
-                            'avg': 0.0,
-                            'best': 10000.0,
-                            'worst': 0.0,
-                            'sdev': 0.0
-                        }
-                        for i in range(hops)
-                    ]
-                    for hop, t in enumerate(z):
-                        receive_count = 0
-                        loss_count = 0
-                        latency_sum = 0.0
-                        stdevs = []
-                        for i in t:
-                            if i:
-                                if i['code'] == 257 or i['code'] == 258:
-                                    receive_count += 1
-                                    _l = i['latency']
-                                    stdevs.append(_l)
-                                    latency_sum += _l
-                                    result[hop]['best'] = min(result[hop]['best'], _l)
-                                    result[hop]['worst'] = max(result[hop]['worst'], _l)
-                                else:
-                                    loss_count += 1
-                                _addr = i['address']
-                                if _addr:
-                                    if _addr not in result[hop]['address']:
-                                        result[hop]['address'].append(_addr)
-                                        result[hop]['rdns'].append(i['rdns'])
-                        if receive_count:
-                            result[hop]['avg'] = latency_sum / receive_count
-
-                        result[hop]['loss'] = loss_count / (loss_count + receive_count)
-                        if not result[hop]['address']:
-                            result[hop]['address'].append('')
-                            result[hop]['rdns'].append('')
-                            result[hop]['best'] = 0.0
-                        if len(stdevs) > 1:
-                            result[hop]['sdev'] = statistics.stdev(stdevs)
-                        result[hop]['received'] = receive_count
-                        result[hop]['lossed'] = loss_count
-
-                    _t = str(time.time())
-                    json_name = f'mtr_{_t}.json'
-                    json_path = f'tmp/json/mtr_{_t}.json'
-                    pic_path = f'tmp/pic/mtr_{_t}.png'
-                    async with async_open(json_path, 'w') as j:
-                        await j.write(json.dumps({
-                            'time': time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()),
-                            'node': serv.name,
-                            'address': address,
-                            'data': result
-                        }))
-                    try:
-                        loop = asyncio.get_event_loop()
-                        await loop.run_in_executor(
-                            session.executor,
-                            netmeasure.mtr_screenshot,
-                            json_name,
-                            pic_path
+                    if agg.rounds != len(rdata):
+                        # http node, or partial frames missed by joining a running request
+                        agg = mtr_aggregator()
+                        agg.add_rounds(rdata)
+                    result = agg.result()
+                    last = result[-1] if result else None
+                    if self.first_use(resp):
+                        self.history.record(
+                            'mtr',
+                            serv.name,
+                            address,
+                            last['address'][0] if last else None,
+                            last['loss'] * 100 if last else None,
+                            last['avg'] if last and last['received'] else None,
+                            data=result
                         )
-                        await session.send_msg(session.picstr(f'file://{os.getcwd()}/{pic_path}'))
-                        # sleep 5 min then delete temp file
-                        await asyncio.sleep(300)
-                    finally:
-                        # clean up
-                        os.remove(json_path)
-                        os.remove(pic_path)
+
+                    mtr_data = {
+                        'time': time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()),
+                        'node': serv.name,
+                        'address': address,
+                        'theme': render.theme(),
+                        'data': result
+                    }
+                    if render_backend == 'selenium':
+                        render_func = netmeasure.mtr_screenshot
+                    else:
+                        render_func = render.mtr_render
+                    try:
+                        await session.send_msg(session.picstr(await self.render(session, render_func, mtr_data)))
+                    except RenderError as err:
+                        await session.send_msg(f'图片渲染失败: {err}')
                 else:
                     await session.send_msg(f'请求失败: {resp.get("info")}')
                 return
@@ -867,12 +1569,136 @@ class netmeasure:
         except argumentparser.ArgumentError as err:
             await session.send_msg(f'{str(err)} \n{self.mtr_parse.format_help()}')
 
+    async def watch_probe(self, kind: str, node: str, target: str, port: int or None) -> dict or None:
+        serv = self.get_server(node)
+        if serv is None:
+            # websocket node offline
+            return None
+        if kind == 'ping':
+            success = lambda d: d.get('code') == 257
+            resp = await serv.ping(target, 0, watch_wait, watch_interval, watch_count, False)
+        else:
+            success = lambda d: d.get('success')
+            resp = await serv.tcping(target, 0, port, watch_wait, watch_interval, watch_count)
+        if resp is None or not resp.get('ok'):
+            return None
+        summary = stats.summarize(*stats.series(resp.get('result').get('data'), success), watch_wait)
+        self.record_latency(kind if port is None else f'tcping:{port}', target, serv, resp, summary)
+        return summary
+
     @staticmethod
-    def speed_screenshot(json_name, pic_file):
-        firefoxdriver.set_window_size(1280, 720)
-        firefoxdriver.get(f'http://{ip}:{port}/netmeasurestatic/speedtest.html?json={json_name}')
-        time.sleep(1)
-        firefoxdriver.find_element_by_id("speed").screenshot(pic_file)
+    def watch_str(spec: dict) -> str:
+        return (
+            f'{spec["id"]}: {spec["kind"]} {spec["target"]}' +
+            (f':{spec["port"]}' if spec.get('port') else '') +
+            f' 节点 {spec["node"]} 每{spec["interval"]}s 丢包率>={spec["loss"]:g}%' +
+            (f' 延迟>={spec["latency"]:g}ms' if spec.get('latency') is not None else '')
+        )
+
+    async def watch_handler(self, msg_event, session):
+        try:
+            arg = self.watch_parse.parse_args(msg_event.message.split(' ')[1:])
+            arg = vars(arg)
+            watches = session.var.setdefault('watch', list())
+            address = arg.get('host')
+            if address is None:
+                if not watches:
+                    await session.send_msg('本会话没有监控')
+                    return
+                await session.send_msg('本会话的监控:\n' + '\n'.join(self.watch_str(w) for w in watches))
+                return
+            if len(watches) >= watch_max_per_session:
+                await session.send_msg(f'每个会话最多 {watch_max_per_session} 个监控')
+                return
+
+            port = arg.get('p')
+            interval = arg.get('t')
+            interval = interval if interval >= watch_min_interval else watch_min_interval
+            remote = arg.get('r').upper()
+            # watch stays on the chosen node
+            serv = self.get_server(remote)
+            if serv is None:
+                await session.send_msg('指定的节点不存在')
+                return
+            spec = {
+                'id': max([w['id'] for w in watches] + [0]) + 1,
+                'kind': 'ping' if port is None else 'tcping',
+                'node': serv.name,
+                'target': address,
+                'port': port,
+                'interval': interval,
+                'loss': arg.get('loss'),
+                'latency': arg.get('latency')
+            }
+            watches.append(spec)
+            self.watch.add(session, spec)
+            await session.bot.save_vars(self.app)
+            await session.send_msg(f'已添加监控 {self.watch_str(spec)}\n超过或恢复阈值时发送消息')
+        except argumentparser.ArgumentError as err:
+            await session.send_msg(f'{str(err)} \n{self.watch_parse.format_help()}')
+
+    async def unwatch_handler(self, msg_event, session):
+        try:
+            arg = vars(self.unwatch_parse.parse_args(msg_event.message.split(' ')[1:]))
+            watches = session.var.setdefault('watch', list())
+            _id = arg.get('id')
+            if _id.lower() == 'all':
+                removed = list(watches)
+            else:
+                removed = [w for w in watches if str(w['id']) == _id]
+            if not removed:
+                await session.send_msg('指定的监控不存在')
+                return
+            for spec in removed:
+                watches.remove(spec)
+                self.watch.remove(session, spec)
+            await session.bot.save_vars(self.app)
+            await session.send_msg(f'已删除 {len(removed)} 个监控')
+        except argumentparser.ArgumentError as err:
+            await session.send_msg(f'{str(err)} \n{self.unwatch_parse.format_help()}')
+
+    async def history_handler(self, msg_event, session):
+        try:
+            arg = self.history_parse.parse_args(msg_event.message.split(' ')[1:])
+            arg = vars(arg)
+            address = arg.get('host')
+            node = arg.get('r').upper() if arg.get('r') else None
+            limit = arg.get('n')
+            limit = limit if limit <= 50 else 50
+            limit = limit if limit > 0 else 10
+            days = arg.get('d')
+            days = days if days > 0 else 1
+
+            aggregates = await self.history.aggregate(address, time.time() - days * 86400, node)
+            recent = await self.history.recent(address, node, limit)
+            if not recent:
+                await session.send_msg(f'没有 {address} 的测试记录')
+                return
+
+            def ms(v):
+                return f'{v:.2f}' if v is not None else '-'
+
+            lines = [f'{address} 最近 {days:g} 天统计:', '节点 类型 次数 丢包率 平均/最小/最大延迟 速度']
+            for _node, kind, runs, loss, avg, low, high, speed in aggregates:
+                lines.append(
+                    f'{_node} {kind} {runs} {ms(loss)}% {ms(avg)}/{ms(low)}/{ms(high)}ms' +
+                    (f' {speed:.2f}Mbps' if speed is not None else '')
+                )
+            lines.append(f'最近 {len(recent)} 次测试:')
+            for t, kind, _node, ip, loss, latency, speed in recent:
+                lines.append(
+                    f'{time.strftime("%m-%d %H:%M:%S", time.localtime(t))} {_node} {kind} {ip or ""} ' +
+                    (f'{loss:.2f}% ' if loss is not None else '') +
+                    (f'{latency:.2f}ms' if latency is not None else '') +
+                    (f' {speed:.2f}Mbps' if speed is not None else '')
+                )
+            await session.send_msg('\n'.join(lines))
+        except argumentparser.ArgumentError as err:
+            await session.send_msg(f'{str(err)} \n{self.history_parse.format_help()}')
+
+    @staticmethod
+    def speed_screenshot(data: dict) -> bytes:
+        return netmeasure.page_screenshot('speed', 'speed', 'stv', data)
 
     @staticmethod
     def bytes_unit(numbers):
@@ -896,9 +1722,7 @@ class netmeasure:
             wait = arg.get('w')
             interval = arg.get('i')
             remote = arg.get('r').upper()
-            serv = self.api_servers_ws.get(remote)
-            if serv is None:
-                serv = self.api_servers_http.get(remote)
+            serv = self.get_server(remote, family)
             if serv is None:
                 await session.send_msg('指定的节点不存在')
                 return
@@ -906,7 +1730,23 @@ class netmeasure:
                 f'正在使用远程节点 {str(serv)} 进行测速。测速总时长: {span} ms, 测速握手超时：{wait} ms, '
                 f'测速采样率{1000/int(interval)}Hz。'
             )
-            resp = await serv.speed(address, family, wait, span, interval)
+            resp = None
+            summary_sent = False
+            received_sum = 0
+            async for frame in serv.stream(serv.speed, address, family, wait, span, interval, owner=session):
+                if frame is None or not frame.get('partial'):
+                    resp = frame
+                    continue
+                samples = frame.get('result').get('data')
+                received_sum += sum(sample.get('received') for sample in samples)
+                point = samples[-1].get('point') if samples else 0
+                if not summary_sent and point >= span / 2:
+                    # half of speed test finished, send current speed
+                    summary_sent = True
+                    await session.send_msg(
+                        f'远程节点 {str(serv)} 已测速 {round(point / 1000, 2)}s, '
+                        f'当前平均速度 {round(8 * received_sum / point / 1000, 2)} Mbps'
+                    )
             if resp is not None:
                 if resp.get('ok'):
                     resolved_address = resp.get('result').get('resolved')
@@ -926,38 +1766,42 @@ class netmeasure:
                             'received': round(8 * receive / (now - start) / 1000, 2)
                         })
                         start = now
-                    _t = str(time.time())
-                    json_name = f'speed_{_t}.json'
-                    json_path = f'tmp/json/speed_{_t}.json'
-                    pic_path = f'tmp/pic/speed_{_t}.png'
-
-                    async with async_open(json_path, 'w') as j:
-                        await j.write(json.dumps({
-                            'ip': resolved_address,
-                            'location': '',
-                            'latency': latency,
-                            'received': received,
-                            'average': round(8 * resp.get('result').get('received') / elapsed / 1000, 2),
-                            'time': time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()),
-                            'node': serv.name,
-                            'data': result_list
-                        }))
 
-                    try:
-                        loop = asyncio.get_event_loop()
-                        await loop.run_in_executor(
-                            session.executor,
-                            netmeasure.speed_screenshot,
-                            json_name,
-                            pic_path
+                    if self.first_use(resp):
+                        self.history.record(
+                            'speed',
+                            serv.name,
+                            address,
+                            resolved_address,
+                            latency=latency,
+                            speed=round(8 * resp.get('result').get('received') / elapsed / 1000, 2),
+                            # raw samples (ms, bytes) kept for statistics, chart shows downsampled points
+                            data={
+                                'received': resp.get('result').get('received'),
+                                'elapsed': elapsed,
+                                'samples': [[r.get('point'), r.get('received')] for r in result_data]
+                            }
                         )
-                        await session.send_msg(session.picstr(f'file://{os.getcwd()}/{pic_path}'))
-                        # sleep 5 min then delete temp file
-                        await asyncio.sleep(300)
-                    finally:
-                        # clean up
-                        os.remove(json_path)
-                        os.remove(pic_path)
+                    speed_data = {
+                        'ip': resolved_address,
+                        'location': '',
+                        'latency': latency,
+                        'received': received,
+                        'average': round(8 * resp.get('result').get('received') / elapsed / 1000, 2),
+                        'time': time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()),
+                        'node': serv.name,
+                        # chart points downsampled from all samples
+                        'data': downsample.minmax(result_list, render.SPEED_CHART_BUCKETS, lambda p: p['received']),
+                        'samples': len(result_list)
+                    }
+                    if render_backend == 'selenium':
+                        render_func = netmeasure.speed_screenshot
+                    else:
+                        render_func = render.speed_render
+                    try:
+                        await session.send_msg(session.picstr(await self.render(session, render_func, speed_data)))
+                    except RenderError as err:
+                        await session.send_msg(f'图片渲染失败: {err}')
                 else:
                     await session.send_msg(f'请求失败: {resp.get("info")}')
                 return
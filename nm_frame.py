@@ -0,0 +1,55 @@
+import re
+import struct
+
+# frame of network-measure reverse websocket api:
+# type (uint32 big endian) + payload length (uint32 big endian) + json payload
+# one websocket message may carry several frames
+HEADER = struct.Struct('!II')
+
+
+class FrameError(ValueError):
+    def __init__(self, msg: str):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+# request id at the start of a response payload
+ID_PATTERN = re.compile(rb'\s*\{\s*"id"\s*:\s*(\d+)')
+
+
+class FrameTooLarge(FrameError):
+    # head: first bytes of the payload, request id is read from it
+    def __init__(self, msg: str, frame_type: int, head: bytes):
+        super().__init__(msg)
+        self.frame_type = frame_type
+        self.head = head
+
+    def request_id(self) -> int or None:
+        # node writes id first: {"id": 123, ...}
+        m = ID_PATTERN.match(self.head)
+        return int(m.group(1)) if m else None
+
+
+def pack(frame_type: int, payload: bytes) -> bytes:
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+
+def unpack(data: bytes, max_size: int):
+    # iterator of (type, payload), payloads are memoryview of data without copy
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < HEADER.size:
+            raise FrameError(f'incomplete frame header at {offset}')
+        frame_type, length = HEADER.unpack_from(view, offset)
+        offset += HEADER.size
+        if length > max_size:
+            raise FrameTooLarge(
+                f'frame of {length} bytes over limit {max_size}', frame_type, bytes(view[offset:offset + 64])
+            )
+        if length > len(view) - offset:
+            raise FrameError(f'frame of {length} bytes but {len(view) - offset} bytes left')
+        yield frame_type, view[offset:offset + length]
+        offset += length
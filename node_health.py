@@ -0,0 +1,77 @@
+import collections
+import time
+
+
+class node_health:
+    # weight of new sample in moving average
+    ALPHA = 0.3
+    # latency samples kept and needed of each operation
+    SAMPLES = 100
+    MIN_SAMPLES = 10
+
+    def __init__(self):
+        # moving average of probe round trip time, ms
+        self.rtt = None
+        # moving average of node errors (timeout, connection, bad response)
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        # target of each address family reachable in last probe
+        # {
+        #     family: True / False / None (not probed)
+        # }
+        self.family = {4: None, 6: None}
+        self.last_probe = None
+        # recent time (ms) of successful requests more than the least time they take
+        # {
+        #     operation: deque of ms
+        # }
+        self.latency = dict()
+
+    def record(self, resp: dict or None, op: str = None, elapsed: float = None):
+        # node error, not failure of the test itself
+        error = resp is None or 'error' in resp
+        self.requests += 1
+        self.errors += error
+        self.error_rate += self.ALPHA * (error - self.error_rate)
+        if not error and op is not None:
+            self.latency.setdefault(op, collections.deque(maxlen=self.SAMPLES)).append(elapsed)
+
+    def percentile(self, op: str, p: float) -> float or None:
+        # None if too few samples
+        samples = sorted(self.latency.get(op, ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def probe(self, family: int, rtt: float, resp: dict or None):
+        self.last_probe = time.time()
+        if resp is None or 'error' in resp:
+            self.family[family] = False
+            return
+        self.rtt = rtt if self.rtt is None else self.rtt + self.ALPHA * (rtt - self.rtt)
+        result = resp.get('result') or {}
+        self.family[family] = bool(resp.get('ok')) and any(
+            d.get('code') == 257 for d in result.get('data') or []
+        )
+
+    def score(self, family: int) -> float or None:
+        # smaller is better, None if node is not usable for family
+        if self.rtt is None or self.error_rate > 0.5:
+            return None
+        if family == 0:
+            if not (self.family[4] or self.family[6]):
+                return None
+        elif not self.family[family]:
+            return None
+        return self.rtt * (1 + self.in_flight) / (1 - self.error_rate)
+
+    def __str__(self) -> str:
+        if self.last_probe is None:
+            return '未探测'
+        rtt = f'{self.rtt:.0f}ms' if self.rtt is not None else '-'
+        family = ' '.join(
+            f'IPv{f}{"可用" if ok else "不可用"}' for f, ok in self.family.items() if ok is not None
+        )
+        return f'延迟 {rtt} 错误率 {self.error_rate * 100:.0f}% 进行中 {self.in_flight} {family}'
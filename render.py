@@ -0,0 +1,366 @@
+import io
+import math
+import time
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from config import render_fonts
+
+
+# loaded fonts
+# {
+#     ('role', size): font
+# }
+fonts = dict()
+
+# colors follow static/css/mtr.css
+mtr_colors = {
+    'day': {
+        'background': '#ffffff',
+        'text': '#000000',
+        'header_background': '#afb42b',
+        'header_text': '#ffffff',
+        'target_address': '#2962ff',
+        'sub': '#333333',
+        'target_sub': '#1976d2',
+        'loss': '#7b1fa2',
+        'min': '#388e3c',
+        'max': '#d32f2f',
+        'avg': '#1976d2',
+        'sdev': '#f57c00',
+        'info': '#aaaaaa'
+    },
+    'night': {
+        'background': '#111111',
+        'text': '#cccccc',
+        'header_background': '#000000',
+        'header_text': '#cccccc',
+        'target_address': '#7096ff',
+        'sub': '#aaaaaa',
+        'target_sub': '#7eaddd',
+        'loss': '#ba80d3',
+        'min': '#68cc6d',
+        'max': '#d65b5b',
+        'avg': '#59a8f7',
+        'sdev': '#ff942a',
+        'info': '#777777'
+    }
+}
+
+# mtr picture layout, same size as the 1.5x scaled mtr.html
+MTR_WIDTH = 1425
+MTR_HEADER_HEIGHT = 108
+MTR_HOP_HEIGHT = 106
+MTR_LINE_HEIGHT = 32
+MTR_DROPPED_HEIGHT = 99
+MTR_INFO_HEIGHT = 66
+MTR_PADDING = 30
+MTR_INDEX_X = 43
+MTR_IP_X = 117
+MTR_IP_WIDTH = 630
+
+
+def theme() -> str:
+    h = time.localtime().tm_hour
+    return 'day' if 7 <= h <= 17 else 'night'
+
+
+def font(role: str, size: int):
+    f = fonts.get((role, size))
+    if f is None:
+        try:
+            f = ImageFont.truetype(render_fonts.get(role), size)
+        except (OSError, ValueError, AttributeError):
+            f = ImageFont.load_default(size)
+        fonts[(role, size)] = f
+    return f
+
+
+def load_fonts():
+    # pre-load fonts used by mtr and speed test picture
+    for role, size in (
+            ('sans', 15 * SPEED_SS),
+            ('sans', 11 * SPEED_SS),
+            ('sans_bold', 36),
+            ('sans', 36),
+            ('sans', 24),
+            ('sans', 21),
+            ('sans_bold', 29),
+            ('sans_bold', 19),
+            ('sans', 19),
+            ('mono', 26),
+            ('mono', 12)
+    ):
+        font(role, size)
+
+
+def fit_text(draw: ImageDraw.ImageDraw, text: str, f, width: int) -> str:
+    if draw.textlength(text, font=f) <= width:
+        return text
+    while text and draw.textlength(text + '…', font=f) > width:
+        text = text[:-1]
+    return text + '…'
+
+
+def draw_segments(draw: ImageDraw.ImageDraw, right: int, y: int, segments):
+    # draw (text, font, color) segments right aligned on one baseline
+    x = right - sum(draw.textlength(text, font=f) for text, f, color in segments)
+    for text, f, color in segments:
+        draw.text((x, y), text, font=f, fill=color, anchor='ls')
+        x += draw.textlength(text, font=f)
+
+
+def png_bytes(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, 'PNG', compress_level=3)
+    return buf.getvalue()
+
+
+def mtr_hop_height(hop: dict) -> int:
+    if not hop.get('address')[0]:
+        return MTR_DROPPED_HEIGHT
+    extra_lines = len([s for s in (hop.get('location'), hop.get('rdns')[0]) if s])
+    return MTR_HOP_HEIGHT + extra_lines * MTR_LINE_HEIGHT
+
+
+def mtr_columns(draw: ImageDraw.ImageDraw, hops: list) -> dict:
+    # column width fit content like css grid min-content, lay out from right side
+    stat_font = font('sans', 21)
+    avg_font = font('sans_bold', 36)
+    minmax_width = sdev_width = avg_width = 0
+    for hop in hops:
+        minmax_width = max(
+            minmax_width,
+            draw.textlength(f'{hop.get("worst"):.2f} ms', font=stat_font),
+            draw.textlength(f'{hop.get("best"):.2f} ms', font=stat_font)
+        )
+        avg_width = max(avg_width, draw.textlength(f'{hop.get("avg"):.2f} ms', font=avg_font))
+        sdev_width = max(sdev_width, draw.textlength(f'{hop.get("sdev"):.2f} ms', font=stat_font))
+
+    sdev_x = MTR_WIDTH - 12 - sdev_width
+    avg_right = sdev_x - 12
+    minmax_right = avg_right - avg_width - 12
+    loss_right = minmax_right - minmax_width - MTR_PADDING
+    return {
+        'loss_right': loss_right,
+        'minmax_right': minmax_right,
+        'avg_right': avg_right,
+        'sdev_x': sdev_x,
+        'stat_center': (loss_right + MTR_WIDTH) // 2,
+        'loss_center': loss_right - 122
+    }
+
+
+def mtr_render(data: dict) -> bytes:
+    colors = mtr_colors[data.get('theme') or theme()]
+    hops = data.get('data')
+
+    height = MTR_HEADER_HEIGHT + sum(map(mtr_hop_height, hops)) + MTR_INFO_HEIGHT
+    img = Image.new('RGB', (MTR_WIDTH, height), colors['background'])
+    draw = ImageDraw.Draw(img)
+    columns = mtr_columns(draw, hops)
+
+    # header
+    draw.rectangle((0, 0, MTR_WIDTH, MTR_HEADER_HEIGHT), fill=colors['header_background'])
+    header_font = font('sans_bold', 36)
+    _y = MTR_HEADER_HEIGHT // 2
+    draw.text((MTR_INDEX_X, _y), '#', font=header_font, fill=colors['header_text'], anchor='mm')
+    draw.text((MTR_IP_X, _y), 'IP', font=header_font, fill=colors['header_text'], anchor='lm')
+    draw.text((columns['loss_center'], _y), 'Loss', font=header_font, fill=colors['header_text'], anchor='mm')
+    draw.text((columns['stat_center'], _y), 'Stat', font=header_font, fill=colors['header_text'], anchor='mm')
+
+    y = MTR_HEADER_HEIGHT
+    for index, hop in enumerate(hops):
+        draw.text((MTR_INDEX_X, y + 30), str(index), font=font('sans', 24), fill=colors['text'], anchor='mm')
+
+        # dropped hop
+        if not hop.get('address')[0]:
+            draw.text((MTR_IP_X, y + 30), '*', font=font('mono', 26), fill=colors['text'], anchor='lm')
+            y += MTR_DROPPED_HEIGHT
+            continue
+
+        target = index == len(hops) - 1
+        address_color = colors['target_address'] if target else colors['text']
+        sub_color = colors['target_sub'] if target else colors['sub']
+
+        # ip block
+        _y = y + 34
+        draw.text(
+            (MTR_IP_X, _y),
+            fit_text(draw, hop.get('address')[0], font('mono', 26), MTR_IP_WIDTH),
+            font=font('mono', 26), fill=address_color, anchor='lm'
+        )
+        for text, f in (
+                (hop.get('location'), font('sans_bold', 19)),
+                (hop.get('rdns')[0], font('sans', 19))
+        ):
+            if text:
+                _y += MTR_LINE_HEIGHT + 8
+                draw.text(
+                    (MTR_IP_X, _y), fit_text(draw, text, f, MTR_IP_WIDTH),
+                    font=f, fill=sub_color, anchor='lm'
+                )
+
+        # loss
+        draw_segments(draw, columns['loss_right'], y + 62, (
+            (f'{hop.get("loss"):.2f}%', font('sans_bold', 29), colors['loss']),
+            (' drop, ', font('sans', 24), colors['text']),
+            (f'{hop.get("received") + hop.get("lossed"):.2f}', font('sans_bold', 29), colors['loss']),
+            (' total', font('sans', 24), colors['text'])
+        ))
+
+        # stat
+        stat_font = font('sans', 21)
+        draw.text(
+            (columns['minmax_right'], y + 37), f'{hop.get("worst"):.2f} ms',
+            font=stat_font, fill=colors['max'], anchor='rm'
+        )
+        draw.text(
+            (columns['minmax_right'], y + 73), f'{hop.get("best"):.2f} ms',
+            font=stat_font, fill=colors['min'], anchor='rm'
+        )
+        draw.text(
+            (columns['avg_right'], y + 55), f'{hop.get("avg"):.2f} ms',
+            font=font('sans_bold', 36), fill=colors['avg'], anchor='rm'
+        )
+        draw.text(
+            (columns['sdev_x'], y + 73), f'{hop.get("sdev"):.2f} ms',
+            font=stat_font, fill=colors['sdev'], anchor='lm'
+        )
+
+        y += mtr_hop_height(hop)
+
+    # info
+    info_font = font('mono', 12)
+    draw.text(
+        (MTR_WIDTH - 12, y + 28), f'MTR to {data.get("address")}',
+        font=info_font, fill=colors['info'], anchor='rm'
+    )
+    draw.text(
+        (MTR_WIDTH - 12, y + 46), f'Node: {data.get("node")} Start time: {data.get("time")}',
+        font=info_font, fill=colors['info'], anchor='rm'
+    )
+
+    return png_bytes(img)
+
+
+# speed test picture layout, same size as speedtest.html in 1280x720 window
+SPEED_WIDTH = 1000
+SPEED_HEIGHT = 540
+SPEED_CHART = (70, 72, 990, 472)
+# speed points are downsampled to highest and lowest point of each chart pixel column
+SPEED_CHART_BUCKETS = SPEED_CHART[2] - SPEED_CHART[0]
+# supersampling for anti-aliased chart line
+SPEED_SS = 2
+speed_colors = {
+    'background': '#ffffff',
+    'text': '#212121',
+    'label': '#373d3f',
+    'grid': '#e0e0e0',
+    'speed': (0, 143, 251),
+    'average': (0, 227, 150)
+}
+
+
+def nice_step(span: float, count: int) -> float:
+    raw = span / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for m in (1, 2, 2.5, 5, 10):
+        if raw <= m * magnitude:
+            return m * magnitude
+    return 10 * magnitude
+
+
+def smooth_points(points: list, steps: int = 8) -> list:
+    # catmull-rom spline through points, like apexcharts smooth stroke
+    if len(points) < 3:
+        return points
+    result = [points[0]]
+    for i in range(len(points) - 1):
+        p0 = points[i - 1] if i > 0 else points[i]
+        p1 = points[i]
+        p2 = points[i + 1]
+        p3 = points[i + 2] if i + 2 < len(points) else p2
+        for s in range(1, steps + 1):
+            t = s / steps
+            t2 = t * t
+            t3 = t2 * t
+            result.append(tuple(
+                0.5 * (
+                    2 * p1[k] + (p2[k] - p0[k]) * t +
+                    (2 * p0[k] - 5 * p1[k] + 4 * p2[k] - p3[k]) * t2 +
+                    (3 * p1[k] - p0[k] - 3 * p2[k] + p3[k]) * t3
+                )
+                for k in (0, 1)
+            ))
+    return result
+
+
+def speed_render(data: dict) -> bytes:
+    ss = SPEED_SS
+    img = Image.new('RGBA', (SPEED_WIDTH * ss, SPEED_HEIGHT * ss), speed_colors['background'])
+    draw = ImageDraw.Draw(img)
+    info_font = font('sans', 15 * ss)
+    label_font = font('sans', 11 * ss)
+
+    # speed test info
+    latency = data.get('latency')
+    for x, y, text in (
+            (91, 12, f'IP address: {data.get("ip")}'),
+            (91, 34, f'Location: {data.get("location")}'),
+            (546, 12, f'Latency: {latency:.2f} ms' if latency is not None else 'Latency: -'),
+            (546, 34, f'Received Bytes: {data.get("received")}')
+    ):
+        draw.text((x * ss, y * ss), text, font=info_font, fill=speed_colors['text'], anchor='lm')
+
+    left, top, right, bottom = (v * ss for v in SPEED_CHART)
+    points = [(p.get('point'), p.get('received')) for p in data.get('data')]
+    average = data.get('average')
+    x_max = max([p[0] for p in points] + [1])
+    y_max = max([p[1] for p in points] + [average, 1])
+    y_step = nice_step(y_max, 4)
+    y_max = math.ceil(y_max / y_step) * y_step
+
+    def px(x, y):
+        return left + (right - left) * x / x_max, bottom - (bottom - top) * y / y_max
+
+    # y axis grid and labels
+    y = 0
+    while y <= y_max + y_step / 2:
+        _, _y = px(0, y)
+        draw.line((left, _y, right, _y), fill=speed_colors['grid'], width=ss)
+        draw.text((left - 6 * ss, _y), f'{y:g}Mbps', font=label_font, fill=speed_colors['label'], anchor='rm')
+        y += y_step
+    # x axis labels
+    for i in range(6):
+        x = x_max * i / 5
+        _x, _ = px(x, 0)
+        draw.text((_x, bottom + 22 * ss), f'{int(x)}s', font=label_font, fill=speed_colors['label'], anchor='mm')
+
+    if points:
+        line = [(_x, min(max(_y, top), bottom)) for _x, _y in smooth_points([px(*p) for p in points])]
+
+        # gradient area fill under speed line
+        mask = Image.new('L', img.size, 0)
+        ImageDraw.Draw(mask).polygon(line + [(line[-1][0], bottom), (line[0][0], bottom)], fill=255)
+        alpha = Image.new('L', img.size, 0)
+        alpha.paste(
+            Image.linear_gradient('L').resize((right - left, bottom - top)).point(lambda v: 140 - v * 100 // 255),
+            (left, top)
+        )
+        fill = Image.new('RGBA', img.size, speed_colors['speed'] + (0, ))
+        fill.putalpha(ImageChops.multiply(alpha, mask))
+        img.alpha_composite(fill)
+
+        draw.line(line, fill=speed_colors['speed'], width=3 * ss, joint='curve')
+        _, _y = px(0, average)
+        draw.line((line[0][0], _y, line[-1][0], _y), fill=speed_colors['average'], width=2 * ss)
+
+    # node info
+    draw.text(
+        ((SPEED_WIDTH - 10) * ss, (SPEED_HEIGHT - 12) * ss),
+        f'Node: {data.get("node")} Start Time: {data.get("time")}',
+        font=info_font, fill=speed_colors['text'], anchor='rm'
+    )
+
+    return png_bytes(img.convert('RGB').resize((SPEED_WIDTH, SPEED_HEIGHT), Image.LANCZOS))
@@ -0,0 +1,238 @@
+import asyncio
+import collections
+import functools
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderError(Exception):
+    def __init__(self, msg: str):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+class RenderQueueFull(RenderError):
+    pass
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+def _init_worker(initializer, initargs: tuple) -> str or None:
+    # error message if initializer failed
+    if initializer is None:
+        return None
+    try:
+        initializer(*initargs)
+    except Exception as e:
+        traceback.print_exc()
+        return f'渲染进程初始化失败: {e}'
+    return None
+
+
+def _worker_main(conn, initializer, initargs: tuple, finalizer):
+    # own process group, browser started by initializer is killed together with the worker
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    try:
+        init_error = _init_worker(initializer, initargs)
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+            func, args = job
+            if init_error is not None:
+                # try again on each job until initializer succeeds
+                init_error = _init_worker(initializer, initargs)
+            if init_error is not None:
+                conn.send((False, RenderError(init_error)))
+                continue
+            try:
+                result = (True, func(*args))
+            except Exception as e:
+                result = (False, e)
+            try:
+                conn.send(result)
+            except Exception as e:
+                # result or exception can not be pickled
+                conn.send((False, RenderError(f'渲染失败: {e}')))
+    finally:
+        if finalizer is not None:
+            finalizer()
+
+
+def _join(processes: list, timeout: float):
+    # wait all processes exit, timeout in total
+    deadline = time.monotonic() + timeout
+    for p in processes:
+        p.join(max(deadline - time.monotonic(), 0))
+
+
+class _worker:
+    # one render process, jobs are sent through a pipe
+    def __init__(self, initializer, initargs: tuple, finalizer):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(child, initializer, initargs, finalizer),
+            daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def call(self, func, args: tuple) -> tuple:
+        # blocking, run in thread, EOFError / OSError if process died
+        self.conn.send((func, args))
+        return self.conn.recv()
+
+    def stop(self):
+        # finish after current job and run finalizer
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def kill(self):
+        # browser may outlive a crashed worker, kill the process group even if worker exited
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except ProcessLookupError:
+            pass
+
+
+class render_pool:
+    def __init__(
+            self,
+            workers: int,
+            queue_size: int,
+            timeout: float,
+            initializer=None,
+            initargs: tuple = (),
+            finalizer=None
+    ):
+        # finalizer: called in worker process when it is stopped normally
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.initializer = initializer
+        self.initargs = initargs
+        self.finalizer = finalizer
+        # worker processes not running a job, and running one,
+        # started on first use when the web server serving pages to browser is up
+        self.idle = list()
+        self.busy = set()
+        # threads waiting results from worker processes
+        self.threads = ThreadPoolExecutor(max_workers=workers)
+
+        # number of jobs hold a worker
+        self.running = 0
+        # futures of jobs waiting for a worker, in submit order
+        self.waiting = collections.deque()
+        self.restarts = 0
+
+    def new_worker(self) -> _worker:
+        return _worker(self.initializer, self.initargs, self.finalizer)
+
+    async def shutdown(self, timeout: float = 5):
+        # idle workers quit browser and exit within timeout second in total, busy ones are killed
+        idle, busy = self.idle, self.busy
+        self.idle = list()
+        self.busy = set()
+        for worker in busy:
+            worker.kill()
+        for worker in idle:
+            worker.stop()
+        if idle:
+            # wait off the event loop
+            await asyncio.get_event_loop().run_in_executor(
+                None, _join, [w.process for w in idle], timeout
+            )
+        for worker in idle:
+            worker.kill()
+        self.threads.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def queued(self) -> int:
+        return len([f for f in self.waiting if not f.done()])
+
+    async def acquire(self, on_queued=None):
+        if self.running < self.workers and not self.queued:
+            self.running += 1
+            return
+        if self.queued >= self.queue_size:
+            raise RenderQueueFull('渲染队列已满, 请稍后再试')
+
+        fut = asyncio.get_event_loop().create_future()
+        self.waiting.append(fut)
+        try:
+            if on_queued is not None:
+                await on_queued(self.queued)
+            # worker handed over by release()
+            await fut
+        except BaseException:
+            # cancelled, or on_queued failed (message not sent)
+            if fut.done() and not fut.cancelled():
+                self.release()
+            else:
+                fut.cancel()
+            raise
+
+    def release(self):
+        while self.waiting:
+            fut = self.waiting.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.running -= 1
+
+    def finish(self, worker: _worker, fut: asyncio.Future):
+        # job ended, worker is free again or replaced if it died or was killed
+        if worker not in self.busy:
+            # pool shut down
+            return
+        self.busy.discard(worker)
+        if fut.cancelled() or fut.exception() is not None:
+            worker.kill()
+            worker.conn.close()
+            worker = self.new_worker()
+            self.restarts += 1
+        self.idle.append(worker)
+        self.release()
+
+    async def submit(self, func, *args, on_queued=None):
+        # on_queued: coroutine function called with queue position when all workers busy
+        loop = asyncio.get_event_loop()
+        for retry in (True, False):
+            await self.acquire(on_queued if retry else None)
+            worker = self.idle.pop() if self.idle else self.new_worker()
+            self.busy.add(worker)
+            job = loop.run_in_executor(self.threads, worker.call, func, args)
+            # worker and slot are given back when the job really ends, even if caller is cancelled
+            job.add_done_callback(functools.partial(self.finish, worker))
+            try:
+                ok, result = await asyncio.wait_for(asyncio.shield(job), self.timeout)
+            except asyncio.TimeoutError:
+                # only the hung worker (and its browser) is killed
+                worker.kill()
+                raise RenderTimeout('渲染超时')
+            except (EOFError, OSError):
+                # worker crashed
+                if not retry:
+                    raise RenderError('渲染进程异常退出')
+                continue
+            if not ok:
+                raise result
+            return result
@@ -0,0 +1,85 @@
+import asyncio
+import collections
+
+
+class job_scheduler:
+    def __init__(self, slots: dict):
+        # concurrent jobs allowed of each class
+        # {
+        #     job class: number of slots
+        # }
+        self.slots = dict(slots)
+        self.running = {job_class: 0 for job_class in slots}
+        # jobs waiting for a slot, owners served round robin
+        # {
+        #     job class: {
+        #         owner: deque of futures
+        #     }
+        # }
+        self.waiting = {job_class: collections.OrderedDict() for job_class in slots}
+
+    def queued(self, job_class: str) -> int:
+        return sum(
+            len([f for f in futures if not f.done()])
+            for futures in self.waiting[job_class].values()
+        )
+
+    async def acquire(self, job_class: str, owner=None):
+        if self.running[job_class] < self.slots[job_class] and not self.queued(job_class):
+            self.running[job_class] += 1
+            return
+
+        fut = asyncio.get_event_loop().create_future()
+        self.waiting[job_class].setdefault(owner, collections.deque()).append(fut)
+        try:
+            # slot handed over by release()
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(job_class, owner)
+            else:
+                fut.cancel()
+            raise
+
+    def release(self, job_class: str, owner=None):
+        waiting = self.waiting[job_class]
+        if owner in waiting:
+            # owner just finished a job waits for others
+            waiting.move_to_end(owner)
+        while waiting:
+            # first owner in turn, moved to the end after served
+            first, futures = next(iter(waiting.items()))
+            while futures and futures[0].done():
+                futures.popleft()
+            if not futures:
+                del waiting[first]
+                continue
+            futures.popleft().set_result(None)
+            if futures:
+                waiting.move_to_end(first)
+            else:
+                del waiting[first]
+            return
+        self.running[job_class] -= 1
+
+    def job(self, job_class: str, owner=None):
+        return _job(self, job_class, owner)
+
+    def __str__(self) -> str:
+        return ' '.join(
+            f'{job_class} {self.running[job_class]}/{self.slots[job_class]}+{self.queued(job_class)}'
+            for job_class in self.slots
+        )
+
+
+class _job:
+    def __init__(self, scheduler: job_scheduler, job_class: str, owner):
+        self.scheduler = scheduler
+        self.job_class = job_class
+        self.owner = owner
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.job_class, self.owner)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release(self.job_class, self.owner)
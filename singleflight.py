@@ -0,0 +1,46 @@
+import asyncio
+
+
+class singleflight:
+    def __init__(self):
+        # calls running now
+        # {
+        #     key: [future of the call, number of waiters]
+        # }
+        self.calls = dict()
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key, func, *args):
+        # concurrent calls with same key share one func(*args) call and get the same result
+        call = self.calls.get(key)
+        if call is None:
+            fut = asyncio.ensure_future(func(*args))
+            call = [fut, 0]
+            self.calls[key] = call
+            fut.add_done_callback(lambda f: self.forget(key, f))
+        else:
+            self.shared += 1
+        fut = call[0]
+        call[1] += 1
+        try:
+            # one waiter cancelled do not cancel the call for others
+            return await asyncio.shield(fut)
+        finally:
+            call[1] -= 1
+            # all waiters gone, cancel the call
+            if call[1] == 0 and not fut.done():
+                # new callers start a new call instead of joining the cancelled one
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+                fut.cancel()
+
+    def forget(self, key, fut):
+        call = self.calls.get(key)
+        if call is not None and call[0] is fut:
+            del self.calls[key]
+        # consume exception of call no one waiting anymore
+        if not fut.cancelled():
+            fut.exception()
@@ -6,28 +6,29 @@ let mtrv = new Vue({
             address: null,
             node: null,
             mtrtime: null,
+            theme: null,
             hopdata: null
         }
     },
 
-    mounted () {
-        axios
-            .get("../netmeasuretmp/json/" + (new URLSearchParams(window.location.search)).get("json"))
-            .then(response => {
-                this.address = response.data.address
-                this.node = response.data.node
-                this.mtrtime = response.data.time
-                this.hopdata = response.data.data
-            })
-            .catch(error => {
-                console.log(error)
-                this.errored = true
-            })
-            .finally(() => this.loading = false)
+    methods: {
+        load (data, token) {
+            this.$el.removeAttribute("data-ready")
+            this.address = data.address
+            this.node = data.node
+            this.mtrtime = data.time
+            this.theme = data.theme
+            this.hopdata = data.data
+            // mark rendered for renderer
+            this.$nextTick(() => this.$el.setAttribute("data-ready", token))
+        }
     },
 
     computed: {
         style_class: function () {
+            if (this.theme) {
+                return this.theme
+            }
             let h = new Date().getHours()
             if (h >= 7 && h <= 17){
                 return "day"
@@ -37,4 +38,4 @@ let mtrv = new Vue({
             }
         }
     }
-});
\ No newline at end of file
+});
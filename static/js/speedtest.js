@@ -62,31 +62,34 @@ let stv = new Vue({
         },
     },
 
-    mounted () {
-        axios
-            .get("../netmeasuretmp/json/" + (new URLSearchParams(window.location.search)).get("json"))
-            .then(response => {
-                this.ip = response.data.ip
-                this.location = response.data.location
-                this.latency = response.data.latency
-                this.received = response.data.received
-                this.stime = response.data.time
-                this.node = response.data.node
-                for(let value of response.data.data){
-                    this.series[0].data.push({
-                        x: value["point"],
-                        y: value["received"]
-                    })
-                    this.series[1].data.push({
-                        x: value['point'],
-                        y: response.data.average
-                    })
-                }
-            })
-            .catch(error => {
-                console.log(error)
-                this.errored = true
+    methods: {
+        load (data, token) {
+            this.$el.removeAttribute("data-ready")
+            this.ip = data.ip
+            this.location = data.location
+            this.latency = data.latency
+            this.received = data.received
+            this.stime = data.time
+            this.node = data.node
+            let speed = []
+            let average = []
+            for(let value of data.data){
+                speed.push({
+                    x: value["point"],
+                    y: value["received"]
+                })
+                average.push({
+                    x: value['point'],
+                    y: data.average
+                })
+            }
+            // mark rendered for renderer after chart redraw
+            this.$nextTick(() => {
+                this.$refs.chart.updateSeries([
+                    {name: 'speed', type: 'area', data: speed},
+                    {name: 'average', type: 'area', data: average}
+                ], false).then(() => this.$el.setAttribute("data-ready", token))
             })
-            .finally(() => this.loading = false)
+        }
     }
-})
\ No newline at end of file
+})
@@ -0,0 +1,123 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    # pure python with array, slower on long series
+    numpy = None
+
+__all__ = [
+    'series',
+    'summarize',
+    'summarize_batch',
+]
+
+# quantiles reported
+PERCENTILES = (50, 90, 99)
+
+
+def series(data: list, success) -> tuple:
+    # (latency list, success list) of node result data, success(d) tells a received probe
+    ok = [bool(d and success(d)) for d in data]
+    latency = [d.get('latency') or 0.0 if s else 0.0 for d, s in zip(data, ok)]
+    return latency, ok
+
+
+def summarize(latency: list, success: list, wait: float) -> dict:
+    return summarize_batch([(latency, success)], wait)[0]
+
+
+def summarize_batch(batch: list, wait: float) -> list:
+    # batch: [(latency list, success list)], summary of each in one pass
+    # a series without any received probe reports wait as its latency
+    # {
+    #     'total': probes, 'success': received, 'loss': loss %,
+    #     'avg', 'min', 'max', 'stdev', 'p50', 'p90', 'p99',
+    #     'jitter': RFC 3550 interarrival jitter of received probes
+    # }
+    if not batch:
+        return []
+    if numpy is not None:
+        return _summarize_numpy(batch, wait)
+    return [_summarize_array(latency, success, wait) for latency, success in batch]
+
+
+def _summary(total: int, received: int, avg, low, high, stdev, percentiles, jitter) -> dict:
+    summary = {
+        'total': total,
+        'success': received,
+        'loss': (total - received) / total * 100 if total else 100.0,
+        'avg': float(avg),
+        'min': float(low),
+        'max': float(high),
+        'stdev': float(stdev),
+        'jitter': float(jitter)
+    }
+    for p, v in zip(PERCENTILES, percentiles):
+        summary[f'p{p}'] = float(v)
+    return summary
+
+
+def _summarize_numpy(batch: list, wait: float) -> list:
+    width = max(max((len(latency) for latency, _ in batch)), 1)
+    # one row each series, received latency packed to the left, nan after
+    values = numpy.full((len(batch), width), numpy.nan)
+    total = numpy.empty(len(batch), dtype=numpy.int64)
+    for row, (latency, success) in enumerate(batch):
+        received = numpy.asarray(latency, dtype=numpy.float64)[numpy.asarray(success, dtype=bool)]
+        values[row, :len(received)] = received
+        total[row] = len(latency)
+    received = numpy.count_nonzero(~numpy.isnan(values), axis=1)
+    # no probe received, report wait
+    values[received == 0, 0] = wait
+    count = numpy.maximum(received, 1)
+
+    avg = numpy.nanmean(values, axis=1)
+    low = numpy.nanmin(values, axis=1)
+    high = numpy.nanmax(values, axis=1)
+    deviation = numpy.nan_to_num(values - avg[:, None])
+    stdev = numpy.sqrt(numpy.sum(deviation * deviation, axis=1) / numpy.maximum(count - 1, 1))
+    percentiles = numpy.nanpercentile(values, PERCENTILES, axis=1)
+
+    # RFC 3550: J += (|D| - J) / 16 over differences of received probes,
+    # unrolled to J = sum(|D[i]| * (15/16) ** (n - 1 - i) / 16) of n differences
+    diff = numpy.nan_to_num(numpy.abs(numpy.diff(values, axis=1)))
+    n = (count - 1)[:, None]
+    i = numpy.arange(width - 1)[None, :]
+    weight = numpy.where(i < n, (15 / 16) ** numpy.maximum(n - 1 - i, 0) / 16, 0.0)
+    jitter = numpy.sum(diff * weight, axis=1)
+
+    return [
+        _summary(
+            int(total[row]), int(received[row]), avg[row], low[row], high[row],
+            stdev[row], percentiles[:, row], jitter[row]
+        )
+        for row in range(len(batch))
+    ]
+
+
+def _percentile(ordered: array, p: float) -> float:
+    # linear interpolation, same as numpy default
+    k = (len(ordered) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordered) - 1)
+    return ordered[f] + (ordered[c] - ordered[f]) * (k - f)
+
+
+def _summarize_array(latency: list, success: list, wait: float) -> dict:
+    values = array('d', (v for v, s in zip(latency, success) if s))
+    received = len(values)
+    if not received:
+        values = array('d', (wait, ))
+    avg = sum(values) / len(values)
+    stdev = 0.0
+    if len(values) > 1:
+        stdev = (sum((v - avg) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+    jitter = 0.0
+    for i in range(1, len(values)):
+        jitter += (abs(values[i] - values[i - 1]) - jitter) / 16
+    ordered = array('d', sorted(values))
+    return _summary(
+        len(latency), received, avg, ordered[0], ordered[-1],
+        stdev, [_percentile(ordered, p) for p in PERCENTILES], jitter
+    )
@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import os
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+
+
+class tmp_store:
+    def __init__(
+            self,
+            app: web.Application,
+            prefix: str,
+            url: str,
+            ttl: int,
+            max_bytes: int,
+            sweep_dirs: tuple = ()
+    ):
+        self.prefix = prefix
+        self.url = url
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_dirs = sweep_dirs
+
+        # data-struct that store temp files, in insert order
+        # {
+        #     'path': (body, content type, expire time)
+        # }
+        self.items = OrderedDict()
+        self.size = 0
+        # (expire time, path) heap for expiry scheduler
+        self.expire_heap = list()
+        self.wakeup = None
+
+        app.add_routes([
+            web.get(prefix + '/{path:.+}', self.get_handler)
+        ])
+        app.on_startup.append(self.app_startup)
+        app.on_cleanup.append(self.app_cleanup)
+
+    async def app_startup(self, app: web.Application):
+        self.sweep()
+        self.wakeup = asyncio.Event()
+        app['tmp_store_expire'] = asyncio.create_task(self.expire_loop())
+
+    async def app_cleanup(self, app: web.Application):
+        app['tmp_store_expire'].cancel()
+
+    def sweep(self):
+        # remove temp files left on disk by old version or crash
+        for d in self.sweep_dirs:
+            if not os.path.isdir(d):
+                continue
+            for f in os.listdir(d):
+                path = os.path.join(d, f)
+                if f != '.gitkeep' and os.path.isfile(path):
+                    os.remove(path)
+
+    def put(self, path: str, body: bytes, content_type: str, ttl: int = None) -> str:
+        if path in self.items:
+            self.remove(path)
+        expire = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        self.items[path] = (body, content_type, expire)
+        self.size += len(body)
+
+        # over size limit, drop oldest
+        while self.size > self.max_bytes and len(self.items) > 1:
+            self.remove(next(iter(self.items)))
+
+        heapq.heappush(self.expire_heap, (expire, path))
+        if self.expire_heap[0][1] == path and self.wakeup is not None:
+            self.wakeup.set()
+        return f'{self.url}{self.prefix}/{path}'
+
+    def remove(self, path: str):
+        item = self.items.pop(path, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+    async def expire_loop(self):
+        while True:
+            self.wakeup.clear()
+            now = time.monotonic()
+            while self.expire_heap and self.expire_heap[0][0] <= now:
+                expire, path = heapq.heappop(self.expire_heap)
+                item = self.items.get(path)
+                # item may be replaced or evicted already
+                if item is not None and item[2] == expire:
+                    self.remove(path)
+            timeout = self.expire_heap[0][0] - now if self.expire_heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def get_handler(self, request: web.Request) -> web.Response:
+        item = self.items.get(request.match_info['path'])
+        if item is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=item[0], content_type=item[1])
@@ -0,0 +1,139 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from aiohttp import web
+
+
+class watch_scheduler:
+    # periodic probes of watched targets
+    # watches of same (kind, node, target, port) share one probe at the shortest interval of them
+    def __init__(self, app: web.Application, probe, max_running: int):
+        # probe(kind, node, target, port) -> latency summary or None
+        self.probe = probe
+        # {
+        #     (kind, node, target, port): {
+        #         'interval': second,
+        #         'due': next probe time,
+        #         'watchers': {(session, watch id): {'spec': watch spec, 'alarm': bool}}
+        #     }
+        # }
+        self.probes = dict()
+        # (due, seq, probe key), entries of removed or rescheduled probes are skipped when popped
+        self.heap = list()
+        self.seq = itertools.count()
+        # created in app_startup on the loop of web server
+        self.wakeup = None
+        self.running = None
+        self.max_running = max_running
+        # probe tasks not finished, cancelled on cleanup
+        self.tasks = set()
+        self.probe_count = 0
+
+        app.on_startup.append(self.app_startup)
+        app.on_cleanup.append(self.app_cleanup)
+
+    async def app_startup(self, app: web.Application):
+        self.wakeup = asyncio.Event()
+        self.running = asyncio.Semaphore(self.max_running)
+        app['watch_scheduler'] = asyncio.create_task(self.loop())
+
+    async def app_cleanup(self, app: web.Application):
+        app['watch_scheduler'].cancel()
+        for task in list(self.tasks):
+            task.cancel()
+
+    def __len__(self) -> int:
+        return sum(len(p['watchers']) for p in self.probes.values())
+
+    @staticmethod
+    def probe_key(spec: dict) -> tuple:
+        return spec['kind'], spec['node'], spec['target'].strip().lower(), spec.get('port')
+
+    def schedule(self, key: tuple, due: float):
+        self.probes[key]['due'] = due
+        heapq.heappush(self.heap, (due, next(self.seq), key))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def add(self, session, spec: dict):
+        key = self.probe_key(spec)
+        probe = self.probes.get(key)
+        if probe is None:
+            probe = {'interval': spec['interval'], 'due': None, 'watchers': dict()}
+            self.probes[key] = probe
+            self.schedule(key, time.monotonic())
+        elif spec['interval'] < probe['interval']:
+            probe['interval'] = spec['interval']
+            self.schedule(key, min(probe['due'], time.monotonic() + spec['interval']))
+        probe['watchers'][(session, spec['id'])] = {'spec': spec, 'alarm': False}
+
+    def remove(self, session, spec: dict):
+        key = self.probe_key(spec)
+        probe = self.probes.get(key)
+        if probe is None:
+            return
+        probe['watchers'].pop((session, spec['id']), None)
+        if not probe['watchers']:
+            # heap entry is skipped later
+            del self.probes[key]
+            return
+        probe['interval'] = min(w['spec']['interval'] for w in probe['watchers'].values())
+
+    def restore(self, sessions: list):
+        # watches saved in session vars
+        for session in sessions:
+            for spec in session.var.get('watch', ()):
+                self.add(session, spec)
+
+    async def loop(self):
+        while True:
+            now = time.monotonic()
+            while self.heap and self.heap[0][0] <= now:
+                due, _, key = heapq.heappop(self.heap)
+                probe = self.probes.get(key)
+                if probe is None or probe['due'] != due:
+                    continue
+                self.schedule(key, due + probe['interval'])
+                task = asyncio.create_task(self.run(key))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            self.wakeup.clear()
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, key: tuple):
+        async with self.running:
+            self.probe_count += 1
+            try:
+                summary = await self.probe(*key)
+            except Exception as e:
+                print(f'watch probe {key} failed: {e}')
+                return
+        probe = self.probes.get(key)
+        if summary is None or probe is None:
+            return
+        for (session, _id), watcher in list(probe['watchers'].items()):
+            spec = watcher['spec']
+            alarm = summary['loss'] >= spec['loss'] or (
+                spec.get('latency') is not None and summary['success'] > 0 and summary['avg'] >= spec['latency']
+            )
+            if alarm == watcher['alarm']:
+                continue
+            # only crossing threshold is reported
+            try:
+                await session.send_msg(
+                    f'[监控 {_id}] 节点 {spec["node"]} 到 {spec["target"]}' +
+                    (f' TCP端口 {spec["port"]}' if spec.get('port') else '') +
+                    f' 丢包率 {round(summary["loss"], 2)}% 平均延迟 {round(summary["avg"], 2)}ms, ' +
+                    ('超过阈值' if alarm else '已恢复')
+                )
+            except Exception as e:
+                # reported again on next probe
+                print(f'watch {_id} message failed: {e}')
+                continue
+            watcher['alarm'] = alarm